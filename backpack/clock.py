@@ -0,0 +1,156 @@
+import asyncio
+from time import monotonic, time
+from loguru import logger
+from backpack.metrics import metrics
+
+# correct signature timestamps with the measured server clock offset
+clock_sync = True
+# seconds between two syncs, and before retrying a failed one
+resync_interval = 300
+retry_interval = 30
+# /api/v1/time requests per sync, the one with the shortest round trip is kept
+sync_samples = 5
+# milliseconds the signature window may take, the exchange refuses more than 60000
+min_window = 5000
+max_window = 60000
+# the window covers this many round trips of the proxy on top of the offset uncertainty
+window_round_trips = 4
+# seconds after a sync before a refused signature may trigger the next one
+min_resync_interval = 5
+# words of an error message that mean the signature was refused
+REJECTION_MARKERS = ("signature", "timestamp", "window", "request has expired")
+
+
+class ServerClock:
+    """
+        Estimates the exchange clock from /api/v1/time and signs with the corrected timestamp.
+
+        Every sync sends a few time requests and keeps the one with the shortest round
+        trip: the server stamped it halfway through, so offset = server - local midpoint
+        with an uncertainty of half the round trip, measured around the HTTP exchange
+        only so the rate limiter wait does not count. The signature window of each proxy
+        grows with its measured round trip. Requests are signed after the rate limiter
+        let them through, for the proxy they are sent through, so the window does not
+        have to cover time queued in the limiter. A refused signature schedules a sync, unless
+        the request was signed before the last sync or that sync is too recent.
+
+        Attributes:
+            offset (float): Milliseconds the server clock is ahead of the local one.
+            uncertainty (float): Half the round trip of the best sample, in milliseconds.
+            syncs (int): Successful syncs.
+            rejections (int): Requests refused because of their signature or timestamp.
+        """
+    def __init__(self):
+        self.offset = 0.0
+        self.uncertainty = 0.0
+        self.syncs = 0
+        self.rejections = 0
+        self._round_trips = {}
+        self._next_sync = 0.0
+        self._synced = 0.0
+        self._synced_at = 0
+        self._inflight = None
+
+    def now(self) -> int:
+        """
+            Returns the server time in milliseconds, the local time when clock_sync is off.
+            """
+        if not clock_sync:
+            return int(time() * 1e3)
+        return int(time() * 1e3 + self.offset)
+
+    def window(self, proxy: str | None) -> int:
+        """
+            Returns the signature window for requests through the proxy, in whole seconds.
+
+            Args:
+                proxy (str | None): The proxy the request goes through.
+
+            Returns:
+                int: Milliseconds between min_window and max_window.
+            """
+        if not clock_sync:
+            return min_window
+        needed = window_round_trips * self._round_trips.get(proxy, 0.0) * 1e3 + 2 * self.uncertainty
+        return min(max_window, max(min_window, -(-int(needed) // 1000) * 1000))
+
+    def observe(self, proxy: str | None, seconds: float):
+        """
+            Records the round trip of a request sent through the proxy.
+            """
+        previous = self._round_trips.get(proxy)
+        self._round_trips[proxy] = seconds if previous is None else previous + 0.2 * (seconds - previous)
+
+    def rejected(self, reason: str, signed_at: int | None = None):
+        """
+            Counts a refused signature and schedules a sync for the next signed request.
+
+            Args:
+                reason (str): The error message.
+                signed_at (int | None): The X-Timestamp of the refused request.
+            """
+        self.rejections += 1
+        metrics.inc("signature_rejections_total")
+        if signed_at is not None and signed_at < self._synced_at:
+            # signed with the offset the last sync already replaced
+            return
+        next_sync = self._synced + min_resync_interval
+        if next_sync < self._next_sync:
+            self._next_sync = next_sync
+            logger.warning(f"Signature refused ({reason}), syncing the clock again")
+
+    async def ensure_synced(self, site):
+        """
+            Syncs the clock through the site when the last sync is too old, once for all callers.
+
+            Args:
+                site (Site): The account whose session sends the time requests.
+
+            Returns:
+                None
+            """
+        if not clock_sync or monotonic() < self._next_sync:
+            return
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self.sync(site))
+            self._inflight.add_done_callback(lambda done: setattr(self, "_inflight", None))
+        await asyncio.shield(self._inflight)
+
+    async def sync(self, site):
+        """
+            Measures the offset with sync_samples time requests, keeping the fastest one.
+
+            A failed sync keeps the previous offset and is retried after retry_interval.
+
+            Args:
+                site (Site): The account whose session sends the time requests.
+
+            Returns:
+                None
+            """
+        best = None
+        for _ in range(sync_samples):
+            try:
+                server, sent, received = await site.server_time(with_times=True)
+            except Exception as e:
+                logger.warning(f"Clock sync request failed: {e}")
+                continue
+            if best is None or received - sent < best[0]:
+                best = (received - sent, server - (sent + received) / 2)
+        if best is None:
+            self._next_sync = monotonic() + retry_interval
+            return
+        self.uncertainty, self.offset = best[0] / 2, best[1]
+        self.syncs += 1
+        self._synced = monotonic()
+        self._synced_at = self.now()
+        self._next_sync = self._synced + resync_interval
+        metrics.set("clock_offset_ms", self.offset)
+        logger.info(f"Server clock offset {self.offset:+.0f}ms (+-{self.uncertainty:.0f}ms)")
+
+    def stats(self) -> dict:
+        return {"offset_ms": self.offset, "uncertainty_ms": self.uncertainty,
+                "syncs": self.syncs, "rejections": self.rejections}
+
+
+server_clock = ServerClock()
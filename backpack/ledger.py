@@ -0,0 +1,171 @@
+import sqlite3
+
+# default location of the local fill ledger
+ledger_path = "data/ledger.sqlite3"
+# fills requested per page of /wapi/v1/history/fills
+page_size = 1000
+# currency the fees are totalled in, fees paid in any other asset are converted at the fill price
+fee_currency = "USDC"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    account TEXT NOT NULL,
+    trade_id TEXT NOT NULL,
+    side TEXT NOT NULL,
+    order_id TEXT,
+    symbol TEXT,
+    price REAL,
+    quantity REAL,
+    fee REAL,
+    fee_symbol TEXT,
+    timestamp TEXT,
+    PRIMARY KEY (account, trade_id, side)
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    account TEXT PRIMARY KEY,
+    fills INTEGER NOT NULL DEFAULT 0,
+    volume REAL NOT NULL DEFAULT 0,
+    fees REAL NOT NULL DEFAULT 0,
+    last_timestamp TEXT
+);
+"""
+
+
+def fee_at_price(fee_symbol: str) -> bool:
+    """
+        Tells whether a fee paid in fee_symbol is converted to fee_currency at the fill price.
+
+        This is the one fee conversion of the ledger totals and of utils.analytics, the same
+        as account_volume: fees in fee_currency are taken as they are, fees in any other
+        asset are multiplied by the fill price.
+
+        Args:
+            fee_symbol (str): The feeSymbol of a fill.
+
+        Returns:
+            bool: True when the fee is multiplied by the fill price.
+        """
+    return fee_symbol != fee_currency
+
+
+def fill_fee(fill: dict) -> float:
+    """
+        Returns the fee of a fill in fee_currency, see fee_at_price.
+
+        Args:
+            fill (dict): A fill of /wapi/v1/history/fills.
+
+        Returns:
+            float: The fee.
+        """
+    if fee_at_price(fill["feeSymbol"]):
+        return float(fill["price"]) * float(fill["fee"])
+    return float(fill["fee"])
+
+
+class Ledger:
+    """
+        Local SQLite copy of every account's fills with running volume and fee totals.
+
+        Fills are synced incrementally: pages are requested newest first until a fill
+        older than the last one stored shows up, and the totals are only updated by
+        the fills that were actually new.
+
+        Attributes:
+            path (str): The SQLite file.
+        """
+    def __init__(self, path: str = ledger_path):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.executescript(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def last_timestamp(self, account: str):
+        row = self._db.execute("SELECT last_timestamp FROM accounts WHERE account = ?", (account,)).fetchone()
+        return row[0] if row else None
+
+    async def sync(self, site) -> int:
+        """
+            Downloads the fills of the site's account that are not in the ledger yet.
+
+            Args:
+                site (Site): The account to sync.
+
+            Returns:
+                int: The number of new fills stored.
+            """
+        last = self.last_timestamp(site.public_key)
+        fills = []
+        offset = 0
+        while True:
+            page = await site.get_user_order_history(limit=page_size, offset=offset)
+            if not isinstance(page, list):
+                raise ValueError(f"Unexpected fill history for {site.public_key}: {page}")
+            # fills at the last stored timestamp are fetched again and skipped by the primary key
+            fresh = [fill for fill in page if last is None or str(fill["timestamp"]) >= last]
+            fills.extend(fresh)
+            if len(fresh) < len(page) or len(page) < page_size:
+                break
+            offset += page_size
+        return self.add(site.public_key, fills)
+
+    def add(self, account: str, fills: list) -> int:
+        """
+            Stores fills of the account and adds the new ones to its totals.
+
+            Args:
+                account (str): The public key of the account.
+                fills (list): Fills of /wapi/v1/history/fills.
+
+            Returns:
+                int: The number of fills that were not stored before.
+            """
+        added = 0
+        volume = 0.0
+        fees = 0.0
+        newest = self.last_timestamp(account)
+        with self._db:
+            for fill in fills:
+                timestamp = str(fill["timestamp"])
+                cursor = self._db.execute(
+                    "INSERT OR IGNORE INTO fills VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (account, str(fill["tradeId"]), fill["side"], str(fill.get("orderId")), fill["symbol"],
+                     float(fill["price"]), float(fill["quantity"]), float(fill["fee"]), fill["feeSymbol"],
+                     timestamp))
+                if cursor.rowcount:
+                    added += 1
+                    volume += float(fill["price"]) * float(fill["quantity"])
+                    fees += fill_fee(fill)
+                    if newest is None or timestamp > newest:
+                        newest = timestamp
+            self._db.execute("INSERT OR IGNORE INTO accounts (account) VALUES (?)", (account,))
+            self._db.execute("UPDATE accounts SET fills = fills + ?, volume = volume + ?, fees = fees + ?, "
+                             "last_timestamp = ? WHERE account = ?",
+                             (added, volume, fees, newest, account))
+        return added
+
+    def fill_rows(self) -> list:
+        """
+            Returns every stored fill, for utils.analytics.
+
+            Returns:
+                list: (account, symbol, side, price, quantity, fee, fee_symbol, timestamp) tuples.
+            """
+        return self._db.execute("SELECT account, symbol, side, price, quantity, fee, fee_symbol, timestamp "
+                                "FROM fills").fetchall()
+
+    def totals(self, account: str) -> tuple:
+        """
+            Returns the running totals of the account.
+
+            Args:
+                account (str): The public key of the account.
+
+            Returns:
+                tuple: (volume, fees, number of fills)
+            """
+        row = self._db.execute("SELECT volume, fees, fills FROM accounts WHERE account = ?",
+                               (account,)).fetchone()
+        return row if row else (0.0, 0.0, 0)
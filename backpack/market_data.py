@@ -0,0 +1,251 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+from collections import defaultdict
+from time import monotonic
+from utils.median import PriceEstimator, price_window
+from utils.tape import TradeTape, tape_capacity
+from backpack.metrics import metrics
+
+# seconds a trade tape snapshot is served without refetching
+refresh_interval = 1.0
+# seconds an old snapshot may still be served when a refresh fails
+max_staleness = 10.0
+# seconds the tape recorder waits for more snapshots before writing a batch
+record_flush_interval = 1.0
+
+
+class TapeRecorder:
+    """
+        Appends recorded trades to DIR/SYMBOL.jsonl from a background thread.
+
+        The event loop only queues the new trades of a refresh. The thread encodes
+        them and writes every batch with one open per symbol file.
+
+        Attributes:
+            directory (str): Where the SYMBOL.jsonl files go.
+            flush_interval (float): Seconds the thread waits for more snapshots.
+        """
+    def __init__(self, directory: str, flush_interval: float = record_flush_interval):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="tape-recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, symbol: str, trades: list):
+        self._queue.put((symbol, trades))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = monotonic() + self.flush_interval
+            while batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - monotonic())))
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            lines = defaultdict(list)
+            for item in batch:
+                if item is not None:
+                    lines[item[0]].append(json.dumps(item[1]) + "\n")
+            if lines:
+                self._write(lines)
+            if stop:
+                return
+
+    def _write(self, lines: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        for symbol, symbol_lines in lines.items():
+            with open(os.path.join(self.directory, f"{symbol}.jsonl"), "a") as f:
+                f.write("".join(symbol_lines))
+
+    def close(self):
+        """
+            Writes the queued snapshots and stops the thread.
+            """
+        self._queue.put(None)
+        self._thread.join()
+
+
+class MarketDataFeed:
+    """
+        Shares the public trade tape of every symbol between all Trade instances.
+
+        The tape is fetched at most once per refresh interval, concurrent callers
+        wait on the single request in flight and a failed refresh falls back to the
+        previous snapshot while it is younger than max_stale.
+
+        Attributes:
+            ttl (float): Seconds a snapshot is fresh.
+            max_stale (float): Seconds a snapshot may be served after a failed refresh.
+            hits (int): Calls served from a fresh snapshot.
+            misses (int): Calls that had to wait for a refresh.
+            fetches (int): Requests actually sent to the exchange.
+            stale_hits (int): Calls served from a stale snapshot after a failed refresh.
+            errors (int): Failed refreshes.
+            window (int): Trades per side kept by each symbol's price estimator.
+            capacity (int): Trades kept by each symbol's tape.
+            record_dir (str | None): Directory the new trades of every refresh are appended to,
+                one SYMBOL.jsonl file per symbol, for utils.replay, written by a TapeRecorder thread.
+        """
+    def __init__(self, ttl: float = refresh_interval, max_stale: float = max_staleness,
+                 window: int = price_window, capacity: int = tape_capacity, record_dir: str | None = None):
+        self.ttl = ttl
+        self.record_dir = record_dir
+        self._recorder = TapeRecorder(record_dir) if record_dir is not None else None
+        self.max_stale = max_stale
+        self.window = window
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.stale_hits = 0
+        self.errors = 0
+        self._snapshots = {}
+        self._inflight = {}
+        self._estimators = {}
+        self._tapes = {}
+
+    async def get(self, symbol: str, site) -> TradeTape:
+        """
+            Returns the trade tape of the symbol, refreshing it through the site if needed.
+
+            Args:
+                symbol (str): The trading symbol.
+                site (Site): The account whose session is used when a refresh is needed.
+
+            Returns:
+                TradeTape: The symbol's shared tape, to be read only.
+            """
+        snapshot = self._snapshots.get(symbol)
+        if snapshot is not None and monotonic() - snapshot[0] < self.ttl:
+            self.hits += 1
+            metrics.inc("feed_hits_total")
+            return snapshot[1]
+        self.misses += 1
+        metrics.inc("feed_misses_total")
+        task = self._inflight.get(symbol)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(symbol, site))
+            self._inflight[symbol] = task
+            task.add_done_callback(lambda done: self._finish(symbol, done))
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            if snapshot is not None and monotonic() - snapshot[0] < self.max_stale:
+                self.stale_hits += 1
+                return snapshot[1]
+            raise
+
+    def _finish(self, symbol: str, task: asyncio.Future):
+        self._inflight.pop(symbol, None)
+        if not task.cancelled():
+            # mark the exception as retrieved even when every waiter has gone away
+            task.exception()
+
+    async def _refresh(self, symbol: str, site) -> TradeTape:
+        self.fetches += 1
+        try:
+            trades = await site.get_order_history(symbol)
+            if not isinstance(trades, list):
+                raise ValueError(f"Unexpected trade history for {symbol}: {trades}")
+        except Exception:
+            self.errors += 1
+            raise
+        tape = self.tape(symbol)
+        added = tape.extend(trades)
+        with metrics.timer("median_update_seconds"):
+            self.estimator(symbol).update_tape(tape, added)
+        if self._recorder is not None and added:
+            # file I/O stays off the event loop
+            self._recorder.record(symbol, tape.to_list(added))
+        self._snapshots[symbol] = (monotonic(), tape)
+        return tape
+
+    def close(self):
+        """
+            Writes the recorded trades that are still queued.
+
+            Returns:
+                None
+            """
+        if self._recorder is not None:
+            self._recorder.close()
+            self._recorder = None
+
+    def tape(self, symbol: str) -> TradeTape:
+        """
+            Returns the trade tape of the symbol without refreshing it.
+
+            Args:
+                symbol (str): The trading symbol.
+
+            Returns:
+                TradeTape: The tape filled by every refresh of the symbol.
+            """
+        tape = self._tapes.get(symbol)
+        if tape is None:
+            tape = self._tapes[symbol] = TradeTape(self.capacity)
+        return tape
+
+    def estimator(self, symbol: str) -> PriceEstimator:
+        """
+            Returns the rolling median estimator of the symbol.
+
+            Args:
+                symbol (str): The trading symbol.
+
+            Returns:
+                PriceEstimator: The estimator fed by every refresh of the symbol.
+            """
+        estimator = self._estimators.get(symbol)
+        if estimator is None:
+            estimator = self._estimators[symbol] = PriceEstimator(self.window)
+        return estimator
+
+    async def bid_price(self, symbol: str, site) -> float:
+        """
+            Returns the rolling median bid price of the symbol, refreshing the tape if needed.
+
+            Args:
+                symbol (str): The trading symbol.
+                site (Site): The account whose session is used when a refresh is needed.
+
+            Returns:
+                float: The median bid price.
+            """
+        await self.get(symbol, site)
+        with metrics.timer("median_seconds", (("side", "Bid"),)):
+            return self.estimator(symbol).bid_price()
+
+    async def ask_price(self, symbol: str, site) -> float:
+        """
+            Returns the rolling median ask price of the symbol, refreshing the tape if needed.
+
+            Args:
+                symbol (str): The trading symbol.
+                site (Site): The account whose session is used when a refresh is needed.
+
+            Returns:
+                float: The median ask price.
+            """
+        await self.get(symbol, site)
+        with metrics.timer("median_seconds", (("side", "Ask"),)):
+            return self.estimator(symbol).ask_price()
+
+    def stats(self) -> dict:
+        """
+            Returns the cache counters.
+
+            Returns:
+                dict: hits, misses, fetches, stale_hits and errors.
+            """
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "fetches": self.fetches,
+                "stale_hits": self.stale_hits,
+                "errors": self.errors}
@@ -0,0 +1,140 @@
+import json
+import math
+import os
+from time import time
+from loguru import logger
+
+API_URL = "https://api.backpack.exchange"
+# on-disk copy of /api/v1/markets and the seconds it is used without asking the API
+cache_path = "data/markets.json"
+cache_ttl = 3600
+
+
+def _read_cache(path: str) -> dict | None:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_cache(path: str, cache: dict):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(cache, f)
+    os.replace(temporary, path)
+
+
+async def _fetch(api_url: str, etag: str | None, proxy: str | None) -> tuple:
+    # aiohttp is only imported when the cache has to be revalidated
+    import aiohttp
+
+    headers = {"If-None-Match": etag} if etag else {}
+    async with aiohttp.ClientSession() as session:
+        async with session.get(api_url + "/api/v1/markets", headers=headers, proxy=proxy,
+                               timeout=aiohttp.ClientTimeout(total=10)) as response:
+            if response.status == 304:
+                return None, etag
+            response.raise_for_status()
+            return await response.json(), response.headers.get("ETag")
+
+
+async def load_markets(api_url: str = API_URL, path: str = cache_path, ttl: float = cache_ttl,
+                       proxy: str | None = None) -> list:
+    """
+        Returns the market list, from the disk cache while it is fresh.
+
+        An expired cache is revalidated with its ETag, and used as it is when the
+        API can't be reached.
+
+        Args:
+            api_url (str): The base URL of the exchange.
+            path (str): The cache file.
+            ttl (float): Seconds the cache is used without asking the API.
+            proxy (str | None): The proxy to fetch through.
+
+        Returns:
+            list: The /api/v1/markets response.
+        """
+    cache = _read_cache(path)
+    if cache is not None and cache.get("api_url") == api_url and time() - cache["fetched_at"] < ttl:
+        return cache["markets"]
+    etag = cache.get("etag") if cache is not None and cache.get("api_url") == api_url else None
+    try:
+        markets, etag = await _fetch(api_url, etag, proxy)
+    except Exception as e:
+        if cache is None:
+            raise
+        logger.warning(f"Markets could not be refreshed, using the cached list: {e}")
+        return cache["markets"]
+    if markets is None:
+        markets = cache["markets"]
+    _write_cache(path, {"api_url": api_url, "fetched_at": time(), "etag": etag, "markets": markets})
+    return markets
+
+
+def market_filters(markets: list) -> dict:
+    """
+        Builds the symbol -> tick size / step size index of the markets.
+
+        Args:
+            markets (list): The /api/v1/markets response.
+
+        Returns:
+            dict: symbol -> {"tick_size": float, "step_size": float, "min_quantity": float}
+        """
+    index = {}
+    for market in markets:
+        filters = market.get("filters") or {}
+        price = filters.get("price") or {}
+        quantity = filters.get("quantity") or {}
+        index[market["symbol"]] = {"tick_size": float(price.get("tickSize") or 0.01),
+                                   "step_size": float(quantity.get("stepSize") or 0.01),
+                                   "min_quantity": float(quantity.get("minQuantity") or 0)}
+    return index
+
+
+def snap_quantity(quantity: float, market: dict) -> float:
+    """
+        Rounds a quantity down to the step size of the market, and up to its minimum quantity.
+
+        Args:
+            quantity (float): The quantity to place.
+            market (dict): The market_filters entry of the symbol.
+
+        Returns:
+            float: The quantity the exchange accepts.
+        """
+    step = market["step_size"]
+    decimals = max(0, -math.floor(math.log10(step))) if step < 1 else 0
+    # the epsilon keeps 0.3 / 0.1 from flooring to 2 steps
+    quantity = round(math.floor(quantity / step + 1e-9) * step, decimals)
+    return max(quantity, round(math.ceil(market["min_quantity"] / step - 1e-9) * step, decimals))
+
+
+def symbol_plan(entries: list, index: dict) -> list:
+    """
+        Checks the configured symbols against the market index and fits their quantity ranges to it.
+
+        Symbols the exchange does not list are skipped with a warning.
+
+        Args:
+            entries (list): The symbol entries from symbols_loader.
+            index (dict): The market_filters index, built once for every account.
+
+        Returns:
+            list: The entries with the "market" of their symbol, quantities snapped to its step size.
+        """
+    plan = []
+    for entry in entries:
+        market = index.get(entry["symbol"])
+        if market is None:
+            logger.warning(f"{entry['symbol']} is not listed by the exchange, skipped")
+            continue
+        min_quantity = snap_quantity(entry["min_quantity"], market)
+        max_quantity = max(min_quantity, snap_quantity(entry["max_quantity"], market))
+        plan.append(dict(entry, min_quantity=min_quantity, max_quantity=max_quantity, market=market))
+    return plan
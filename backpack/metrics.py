@@ -0,0 +1,256 @@
+import asyncio
+import json
+from bisect import bisect_left
+from contextlib import nullcontext
+from time import perf_counter, time
+from loguru import logger
+
+# upper bounds in seconds of the latency histogram buckets
+latency_buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# seconds between two event loop lag probes
+lag_interval = 0.5
+
+
+class Histogram:
+    """
+        Cumulative histogram with fixed bucket bounds, as Prometheus exposes it.
+
+        Attributes:
+            bounds (tuple): Upper bounds of the buckets.
+            counts (list): Observations per bucket, the last one is +Inf.
+            total (float): Sum of all observations.
+            count (int): Number of observations.
+        """
+    def __init__(self, bounds: tuple = latency_buckets):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """
+            Returns the upper bound of the bucket holding the q-quantile.
+
+            Args:
+                q (float): The quantile, between 0 and 1.
+
+            Returns:
+                float: The bucket bound, inf when it falls into the last bucket.
+            """
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank and count:
+                return bound
+        return 0.0
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "labels", "started")
+
+    def __init__(self, metrics, name: str, labels: tuple):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, perf_counter() - self.started, self.labels)
+
+
+class Metrics:
+    """
+        Process-wide counters, gauges and latency histograms of the hot path.
+
+        Every recording call returns at once while the registry is disabled, so the
+        instrumentation costs one attribute check when nobody is looking.
+
+        Attributes:
+            enabled (bool): Whether observations are recorded.
+            started (float): Unix time the registry was enabled at.
+        """
+    def __init__(self):
+        self.enabled = False
+        self.started = time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._lag_task = None
+
+    def enable(self):
+        """
+            Starts recording and probing the event loop lag of the running loop.
+
+            Returns:
+                None
+            """
+        self.enabled = True
+        self.started = time()
+        if self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._probe_lag())
+
+    def disable(self):
+        self.enabled = False
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+
+    def inc(self, name: str, value: float = 1, labels: tuple = ()):
+        if self.enabled:
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, labels: tuple = ()):
+        if self.enabled:
+            self.gauges[(name, labels)] = value
+
+    def observe(self, name: str, value: float, labels: tuple = ()):
+        if self.enabled:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = Histogram()
+            histogram.observe(value)
+
+    def timer(self, name: str, labels: tuple = ()):
+        """
+            Returns a context manager observing the seconds spent inside it.
+
+            Args:
+                name (str): The histogram name.
+                labels (tuple): (label, value) pairs.
+
+            Returns:
+                A context manager, a shared no-op one while disabled.
+            """
+        if not self.enabled:
+            return _null_timer
+        return _Timer(self, name, labels)
+
+    async def _probe_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + lag_interval
+            await asyncio.sleep(lag_interval)
+            lag = max(0.0, loop.time() - expected)
+            self.set("event_loop_lag_last_seconds", lag)
+            self.observe("event_loop_lag_seconds", lag)
+
+    def _derived(self) -> dict:
+        elapsed = max(1e-9, time() - self.started)
+        orders = {}
+        volume_per_sec = {}
+        for (name, labels), value in self.counters.items():
+            if name == "orders_total":
+                outcome = dict(labels).get("outcome")
+                orders[outcome] = orders.get(outcome, 0) + value
+            elif name == "volume_total":
+                volume_per_sec[dict(labels).get("account")] = value / elapsed
+        total = sum(orders.values())
+        return {"fill_ratio": orders.get("Filled", 0) / total if total else 0.0,
+                "volume_per_second": volume_per_sec}
+
+    def snapshot(self) -> dict:
+        """
+            Returns every metric as plain JSON-serializable data.
+
+            Returns:
+                dict: counters, gauges, histograms (count, sum, p50, p99) and derived values.
+            """
+        def key(name, labels):
+            return name + "".join(f",{label}={value}" for label, value in labels)
+
+        return {"timestamp": time(),
+                "counters": {key(*k): v for k, v in self.counters.items()},
+                "gauges": {key(*k): v for k, v in self.gauges.items()},
+                "histograms": {key(*k): {"count": h.count, "sum": h.total,
+                                         "p50": h.quantile(0.5), "p99": h.quantile(0.99)}
+                               for k, h in self.histograms.items()},
+                **self._derived()}
+
+    def prometheus(self) -> str:
+        """
+            Renders every metric in the Prometheus text exposition format.
+
+            Returns:
+                str: The exposition text.
+            """
+        def labels_text(labels, extra=()):
+            pairs = tuple(labels) + tuple(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{label}="{value}"' for label, value in pairs) + "}"
+
+        lines = []
+        for (name, labels), value in sorted(self.counters.items()):
+            lines.append(f"backpack_{name}{labels_text(labels)} {value}")
+        for (name, labels), value in sorted(self.gauges.items()):
+            lines.append(f"backpack_{name}{labels_text(labels)} {value}")
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            cumulative = 0
+            for bound, count in zip(histogram.bounds + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f"backpack_{name}_bucket{labels_text(labels, (('le', bound),))} {cumulative}")
+            lines.append(f"backpack_{name}_sum{labels_text(labels)} {histogram.total}")
+            lines.append(f"backpack_{name}_count{labels_text(labels)} {histogram.count}")
+        derived = self._derived()
+        lines.append(f"backpack_fill_ratio {derived['fill_ratio']}")
+        return "\n".join(lines) + "\n"
+
+
+async def serve(port: int, host: str = "127.0.0.1"):
+    """
+        Serves the metrics on http://host:port/metrics (Prometheus text) and /metrics.json.
+
+        Args:
+            port (int): The port to listen on.
+            host (str): The interface to listen on.
+
+        Returns:
+            aiohttp.web.AppRunner: The runner, call cleanup() on it to stop serving.
+        """
+    from aiohttp import web
+
+    async def prometheus(request):
+        return web.Response(text=metrics.prometheus(), content_type="text/plain")
+
+    async def snapshot(request):
+        return web.json_response(metrics.snapshot())
+
+    app = web.Application()
+    app.router.add_get("/metrics", prometheus)
+    app.router.add_get("/metrics.json", snapshot)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrics are served on http://{host}:{port}/metrics")
+    return runner
+
+
+async def dump_periodically(path: str, interval: float = 10):
+    """
+        Writes a JSON snapshot of the metrics to the file every interval seconds.
+
+        Args:
+            path (str): The file to overwrite with every snapshot.
+            interval (float): Seconds between two snapshots.
+
+        Returns:
+            None: Runs until cancelled.
+        """
+    while True:
+        await asyncio.sleep(interval)
+        with open(path, "w") as f:
+            json.dump(metrics.snapshot(), f)
+
+
+_null_timer = nullcontext()
+metrics = Metrics()
@@ -0,0 +1,216 @@
+import asyncio
+from collections import defaultdict
+from time import monotonic
+from loguru import logger
+from enums.request_enums import Side
+from backpack.metrics import metrics
+
+# seconds between two reconciliations of an account
+reconcile_interval = 10
+# seconds an order may rest before it is cancelled
+max_order_age = 60
+# place cancelled orders again at the current median price
+reprice_stale = False
+# stale orders cancelled one by one per reconciliation at most, the oldest first, the rest wait for the next one
+max_cancels = 5
+# newest fills fetched to settle the orders that left the book
+fill_lookback = 200
+
+
+class OpenOrderTracker:
+    """
+        Keeps the resting ("New") orders of one account and reconciles them in batches.
+
+        Every reconciliation costs one query of all open orders and one page of fills
+        when some orders left the book. Stale orders are cancelled with one cancel-all
+        when they are the only orders of their symbol, otherwise one by one so fresh
+        orders and orders placed outside the bot stay in the book. The one by one
+        cancels are capped at max_cancels per reconciliation, which keeps the cost of
+        a reconciliation bounded whatever the number of open orders: a backlog of
+        stale orders is worked off over several reconciliations instead of in a burst,
+        at the price of those orders resting up to a few intervals longer. Fills of
+        orders that left the book are added to the volume of the Trade that placed them.
+
+        Attributes:
+            site (Site): The account the requests are sent with.
+            orders (dict): order id -> {"trade", "params", "side", "symbol", "price", "quantity", "placed"}.
+            interval (float): Seconds between two reconciliations.
+            max_age (float): Seconds after which an order is stale.
+            reprice (bool): Place cancelled stale orders again at the current price.
+            max_cancels (int): Orders cancelled one by one per reconciliation at most.
+            requests (int): Requests sent by the tracker.
+            settled (int): Orders that left the book on their own.
+            cancelled (int): Stale orders cancelled.
+            repriced (int): Cancelled orders placed again.
+        """
+    def __init__(self, site, interval: float = reconcile_interval, max_age: float = max_order_age,
+                 reprice: bool = reprice_stale, max_cancels: int = max_cancels):
+        self.site = site
+        self.orders = {}
+        self.interval = interval
+        self.max_age = max_age
+        self.reprice = reprice
+        self.max_cancels = max_cancels
+        self.requests = 0
+        self.settled = 0
+        self.cancelled = 0
+        self.repriced = 0
+        self._task = None
+
+    def __len__(self):
+        return len(self.orders)
+
+    def track(self, order: dict, params: dict, trade):
+        """
+            Records an order the exchange accepted without filling it.
+
+            Args:
+                order (dict): The /api/v1/order response.
+                params (dict): The parameters the order was placed with.
+                trade (Trade): The Trade the volume of its fills goes to.
+
+            Returns:
+                None
+            """
+        self.orders[str(order["id"])] = {"trade": trade, "params": params, "side": Side(order["side"]),
+                                         "symbol": order["symbol"], "price": float(order["price"]),
+                                         "quantity": float(order["quantity"]), "placed": monotonic()}
+
+    async def reconcile(self):
+        """
+            Settles the orders that left the book and cancels the stale ones.
+
+            Returns:
+                None
+            """
+        if not self.orders:
+            return
+        # orders tracked while the query is in flight may be missing from its answer
+        tracked = list(self.orders)
+        open_orders = await self.site.get_open_orders()
+        self.requests += 1
+        if not isinstance(open_orders, list):
+            logger.warning(f"{self.site.public_key} open orders were not fetched: {open_orders}")
+            return
+        open_ids = {str(order["id"]) for order in open_orders}
+        closed = [order_id for order_id in tracked if order_id not in open_ids and order_id in self.orders]
+        if closed:
+            await self._settle(closed)
+        now = monotonic()
+        stale = defaultdict(list)
+        for order_id in tracked:
+            order = self.orders.get(order_id)
+            if order is not None and now - order["placed"] >= self.max_age:
+                stale[order["symbol"]].append(order_id)
+        budget = self.max_cancels
+        for symbol, order_ids in stale.items():
+            # cancel-all only when it takes nothing but the stale orders of the symbol
+            stale_ids = set(order_ids)
+            others = {str(order["id"]) for order in open_orders if order["symbol"] == symbol} - stale_ids
+            fresh = any(order["symbol"] == symbol for order_id, order in self.orders.items()
+                        if order_id not in stale_ids)
+            if not others and not fresh:
+                await self._cancel(symbol, order_ids, cancel_all=True)
+            elif budget > 0:
+                await self._cancel(symbol, order_ids[:budget])
+                budget -= len(order_ids[:budget])
+        metrics.set("open_orders", len(self.orders), (("account", self.site.public_key),))
+
+    async def _settle(self, closed: list):
+        fills = await self.site.get_user_order_history(fill_lookback)
+        self.requests += 1
+        if not isinstance(fills, list):
+            return
+        executed = defaultdict(float)
+        for fill in fills:
+            executed[str(fill.get("orderId"))] += float(fill["price"]) * float(fill["quantity"])
+        for order_id in closed:
+            order = self.orders.pop(order_id, None)
+            if order is None:
+                continue
+            self._credit(order, executed.get(order_id, 0.0))
+            self.settled += 1
+
+    async def _cancel(self, symbol: str, order_ids: list, cancel_all: bool = False):
+        if cancel_all:
+            cancelled = await self.site.cancel_all(symbol)
+            self.requests += 1
+            if not isinstance(cancelled, list):
+                logger.warning(f"{self.site.public_key} {symbol} orders were not cancelled: {cancelled}")
+                return
+        else:
+            results = await asyncio.gather(*(self.site.cancel_order(symbol, order_id) for order_id in order_ids),
+                                           return_exceptions=True)
+            self.requests += len(order_ids)
+            # an order that filled or was cancelled meanwhile is settled by the next reconciliation
+            cancelled = [item for item in results if isinstance(item, dict) and "id" in item]
+        replaced = []
+        count = 0
+        for item in cancelled:
+            order = self.orders.pop(str(item.get("id")), None)
+            if order is None:
+                continue
+            executed = float(item.get("executedQuantity") or 0)
+            self._credit(order, executed * order["price"])
+            self.cancelled += 1
+            count += 1
+            remaining = round(order["quantity"] - executed, 2)
+            if self.reprice and remaining > 0:
+                replaced.append((order, remaining))
+        logger.info(f"{self.site.public_key} cancelled {count}/{len(order_ids)} stale {symbol} orders")
+        if replaced:
+            await asyncio.gather(*(self._reprice(order, quantity) for order, quantity in replaced),
+                                 return_exceptions=True)
+
+    async def _reprice(self, order: dict, quantity: float):
+        trade = order["trade"]
+        price = await (trade.bid_price() if order["side"] == Side.BUY else trade.ask_price())
+        params = dict(order["params"], price=str(price), quantity=str(quantity))
+        r = await (trade.batcher.submit(params) if trade.batcher is not None else trade.execute_order(params))
+        # a repriced order that rests again is tracked again by _handle_outcome
+        trade._handle_outcome(order["side"], price, params, r)
+        self.repriced += 1
+
+    def _credit(self, order: dict, volume: float):
+        if volume:
+            trade = order["trade"]
+            trade.volume += volume
+            metrics.inc("volume_total", volume, (("account", trade.public_key),))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reconcile()
+            except Exception as e:
+                logger.error(f"{self.site.public_key} reconciliation failed: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+def share_trackers(trades: list, **config) -> dict:
+    """
+        Gives every Trade of an account the same OpenOrderTracker and starts it.
+
+        Args:
+            trades (list): The Trade instances, several may belong to one account.
+            **config: Passed to OpenOrderTracker (interval, max_age, reprice).
+
+        Returns:
+            dict: public key -> OpenOrderTracker
+        """
+    trackers = {}
+    for trade in trades:
+        tracker = trackers.get(trade.public_key)
+        if tracker is None:
+            tracker = trackers[trade.public_key] = OpenOrderTracker(trade, **config)
+            tracker.start()
+        trade.open_orders = tracker
+    return trackers
@@ -0,0 +1,132 @@
+import asyncio
+from loguru import logger
+from backpack.metrics import metrics
+
+# seconds an order waits for other orders of the same account before the batch is sent
+batch_delay = 0.005
+# orders sent in one /api/v1/orders request at most
+max_batch_orders = 20
+# statuses meaning the batch endpoint is not served, orders are then sent one by one
+UNAVAILABLE_STATUSES = (404, 405, 501)
+
+
+def _error_message(result):
+    # a refused order of a batch is {"code", "message"}, a single post answers with the message alone
+    if isinstance(result, dict) and "message" in result and "status" not in result:
+        return result["message"]
+    return result
+
+
+class OrderBatcher:
+    """
+        Collects the orders of one account and sends them as a single signed /api/v1/orders request.
+
+        Every Trade of the account submits through the same batcher. Orders that
+        arrive within batch_delay of each other share a request, and each caller
+        gets back its own element of the response, as if it had posted alone.
+        When the exchange does not serve the batch endpoint, the batcher falls
+        back to one /api/v1/order request per order for good.
+
+        Attributes:
+            site (Site): The account that signs and sends the batches.
+            delay (float): Seconds the first order of a batch waits for others.
+            max_orders (int): Orders per batch, a full batch is sent at once.
+            available (bool): False once the batch endpoint turned out to be missing.
+            batches (int): Batch requests sent.
+            orders (int): Orders submitted.
+            tasks (set): The batches being sent, referenced until they are done.
+        """
+    def __init__(self, site, delay: float = batch_delay, max_orders: int = max_batch_orders):
+        self.site = site
+        self.delay = delay
+        self.max_orders = max_orders
+        self.available = True
+        self.batches = 0
+        self.orders = 0
+        self.tasks = set()
+        self._pending = []
+        self._timer = None
+
+    async def submit(self, params: dict):
+        """
+            Places an order in the next batch of the account.
+
+            Args:
+                params (dict): The order parameters.
+
+            Returns:
+                dict or str: The order, or the error text, as /api/v1/order would return it.
+            """
+        self.orders += 1
+        if not self.available:
+            return await self.site.execute_order(params)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((params, future))
+        if len(self._pending) >= self.max_orders:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.delay, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            # the loop only keeps a weak reference to a task
+            task = asyncio.ensure_future(self._send(pending))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _send(self, pending: list):
+        orders = [params for params, _ in pending]
+        try:
+            if len(orders) == 1 or not self.available:
+                results = await asyncio.gather(*(self.site.execute_order(params) for params in orders),
+                                               return_exceptions=True)
+            else:
+                results = await self._send_batch(orders)
+        except Exception as e:
+            results = [e] * len(orders)
+        for (_, future), result in zip(pending, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _send_batch(self, orders: list) -> list:
+        result, status = await self.site.execute_orders(orders)
+        self.batches += 1
+        metrics.inc("order_batches_total")
+        metrics.inc("order_batch_orders_total", len(orders))
+        if status in UNAVAILABLE_STATUSES:
+            self.available = False
+            logger.warning(f"Batch orders are not available ({status}), sending orders one by one")
+            return await asyncio.gather(*(self.site.execute_order(params) for params in orders),
+                                        return_exceptions=True)
+        if isinstance(result, list) and len(result) == len(orders):
+            return [_error_message(item) for item in result]
+        # the whole request was refused, every order gets the error like a single post would
+        return [_error_message(result)] * len(orders)
+
+
+def share_batchers(trades: list) -> dict:
+    """
+        Gives every Trade of an account the same OrderBatcher.
+
+        Args:
+            trades (list): The Trade instances, several may belong to one account.
+
+        Returns:
+            dict: public key -> OrderBatcher
+        """
+    batchers = {}
+    for trade in trades:
+        batcher = batchers.get(trade.public_key)
+        if batcher is None:
+            batcher = batchers[trade.public_key] = OrderBatcher(trade)
+        trade.batcher = batcher
+    return batchers
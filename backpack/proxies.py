@@ -0,0 +1,241 @@
+import asyncio
+from collections import Counter
+from time import monotonic, perf_counter
+from loguru import logger
+from backpack.markets import API_URL
+
+# weight of the newest observation in the RTT and error rate averages
+ewma_alpha = 0.2
+# consecutive failures, or error rate, after which a proxy is quarantined
+max_consecutive_errors = 3
+max_error_rate = 0.5
+# seconds a quarantined proxy rests before it is probed again, doubled on every failed probe
+quarantine_time = 30
+max_quarantine_time = 600
+# seconds between two rounds of probes
+probe_interval = 10
+probe_timeout = 10
+# endpoint requested through a proxy to check it
+probe_path = "/api/v1/ping"
+# a sticky account leaves its proxy only when another one is this many times faster
+switch_ratio = 3
+
+
+def mask(proxy: str | None) -> str:
+    """
+        Returns the proxy without its credentials, for logs.
+
+        Args:
+            proxy (str | None): The proxy URL.
+
+        Returns:
+            str: host:port of the proxy, or "direct".
+        """
+    if proxy is None:
+        return "direct"
+    return proxy.rsplit("@", 1)[-1].split("://")[-1]
+
+
+class ProxyHealth:
+    """
+        Passive and probed health of one proxy.
+
+        Attributes:
+            proxy (str): The proxy URL.
+            rtt (float | None): Moving average of the request round trip in seconds.
+            error_rate (float): Moving average of failed requests, between 0 and 1.
+            consecutive_errors (int): Failures since the last success.
+            quarantined_until (float): monotonic() time the quarantine ends, 0 when admitted.
+            quarantines (int): Times the proxy was quarantined in a row.
+        """
+    def __init__(self, proxy: str):
+        self.proxy = proxy
+        self.rtt = None
+        self.error_rate = 0.0
+        self.consecutive_errors = 0
+        self.quarantined_until = 0.0
+        self.quarantines = 0
+
+    @property
+    def quarantined(self) -> bool:
+        return self.quarantined_until > 0
+
+    @property
+    def score(self) -> float:
+        """
+            Expected seconds per successful request, lower is healthier.
+            """
+        rtt = self.rtt if self.rtt is not None else 1.0
+        return rtt / max(0.05, 1 - self.error_rate)
+
+    def record(self, rtt: float | None, ok: bool):
+        self.error_rate += ewma_alpha * ((0.0 if ok else 1.0) - self.error_rate)
+        if ok:
+            self.consecutive_errors = 0
+            self.rtt = rtt if self.rtt is None else self.rtt + ewma_alpha * (rtt - self.rtt)
+        else:
+            self.consecutive_errors += 1
+
+
+class ProxyManager:
+    """
+        Routes every account through its healthiest eligible proxy.
+
+        Each account sticks to its own proxy (the one on its line of proxies.txt) and
+        is moved only when that proxy is quarantined or much slower than the best one.
+        Moved accounts are spread over the eligible proxies by score and load. Proxies
+        that keep failing are quarantined and probed again with a growing delay. An
+        account never goes direct while the manager has proxies: when all of them are
+        quarantined it uses the one closest to its next probe.
+
+        Attributes:
+            proxies (dict): proxy URL -> ProxyHealth.
+            sticky (bool): Keep accounts on their current proxy while it is healthy.
+            probe_url (str): URL requested to check a proxy.
+        """
+    def __init__(self, proxies: list, probe_url: str = API_URL + probe_path, sticky: bool = True):
+        self.proxies = {proxy: ProxyHealth(proxy) for proxy in proxies if proxy is not None}
+        self.sticky = sticky
+        self.probe_url = probe_url
+        self._routes = {}
+        self._task = None
+
+    def _eligible(self) -> list:
+        return [health for health in self.proxies.values() if not health.quarantined]
+
+    def route(self, account: str, preferred: str | None = None) -> str | None:
+        """
+            Returns the proxy the account's next request goes through.
+
+            Args:
+                account (str): The public key of the account.
+                preferred (str | None): The proxy assigned to the account in the config.
+
+            Returns:
+                str | None: The proxy URL, None only when the manager has no proxy at all.
+            """
+        current = self.proxies.get(self._routes.get(account, preferred))
+        eligible = self._eligible()
+        if not eligible:
+            if current is not None:
+                return current.proxy
+            if not self.proxies:
+                return preferred
+            # every proxy is quarantined, the one probed next is the least bad
+            target = min(self.proxies.values(), key=lambda health: health.quarantined_until)
+        else:
+            best = min(eligible, key=lambda health: health.score)
+            if current is not None and not current.quarantined and \
+                    (current is best or self.sticky and current.score <= best.score * switch_ratio):
+                self._routes[account] = current.proxy
+                return current.proxy
+            # displaced accounts are spread by expected load, not all moved onto the best proxy
+            load = Counter(self._routes.values())
+            target = min(eligible, key=lambda health: health.score * (1 + load[health.proxy]))
+        logger.info(f"{account} moves from {mask(current.proxy if current else None)} to {mask(target.proxy)}")
+        self._routes[account] = target.proxy
+        return target.proxy
+
+    def report(self, proxy: str | None, rtt: float | None, ok: bool):
+        """
+            Records the outcome of a request sent through the proxy.
+
+            Args:
+                proxy (str | None): The proxy URL.
+                rtt (float | None): Seconds the request took, None when it failed.
+                ok (bool): False when the request failed because of the connection or the proxy.
+
+            Returns:
+                None
+            """
+        health = self.proxies.get(proxy)
+        if health is None:
+            return
+        health.record(rtt, ok)
+        if not health.quarantined and (health.consecutive_errors >= max_consecutive_errors
+                                       or health.error_rate > max_error_rate):
+            self._quarantine(health)
+
+    def _quarantine(self, health: ProxyHealth):
+        health.quarantines += 1
+        delay = min(max_quarantine_time, quarantine_time * 2 ** (health.quarantines - 1))
+        health.quarantined_until = monotonic() + delay
+        logger.warning(f"Proxy {mask(health.proxy)} quarantined for {delay}s "
+                       f"(error rate {health.error_rate:.2f}, {health.consecutive_errors} errors in a row)")
+
+    def _admit(self, health: ProxyHealth):
+        health.quarantined_until = 0.0
+        health.quarantines = 0
+        health.consecutive_errors = 0
+        health.error_rate = 0.0
+        logger.info(f"Proxy {mask(health.proxy)} re-admitted, rtt {health.rtt:.3f}s")
+
+    async def probe(self, health: ProxyHealth) -> bool:
+        """
+            Sends one request through the proxy and records its round trip.
+
+            Args:
+                health (ProxyHealth): The proxy to check.
+
+            Returns:
+                bool: True when the proxy answered.
+            """
+        import aiohttp
+
+        started = perf_counter()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(self.probe_url, proxy=health.proxy,
+                                       timeout=aiohttp.ClientTimeout(total=probe_timeout)) as response:
+                    await response.read()
+                    ok = response.status < 500 and response.status != 407
+        except Exception:
+            ok = False
+        health.record(perf_counter() - started if ok else None, ok)
+        return ok
+
+    async def check_all(self):
+        """
+            Probes every proxy concurrently and quarantines the ones that fail.
+
+            Returns:
+                None
+            """
+        healths = list(self.proxies.values())
+        results = await asyncio.gather(*(self.probe(health) for health in healths))
+        for health, ok in zip(healths, results):
+            if not ok:
+                self._quarantine(health)
+        logger.info(f"{sum(results)}/{len(results)} proxies are healthy")
+
+    async def _probe_quarantined(self):
+        while True:
+            await asyncio.sleep(probe_interval)
+            now = monotonic()
+            due = [health for health in self.proxies.values()
+                   if health.quarantined and health.quarantined_until <= now]
+            for health, ok in zip(due, await asyncio.gather(*(self.probe(health) for health in due))):
+                if ok:
+                    self._admit(health)
+                else:
+                    self._quarantine(health)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._probe_quarantined())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict:
+        """
+            Returns the health of every proxy, keyed by host:port.
+
+            Returns:
+                dict: host:port -> {"rtt", "error_rate", "quarantined"}
+            """
+        return {mask(proxy): {"rtt": health.rtt, "error_rate": health.error_rate,
+                              "quarantined": health.quarantined}
+                for proxy, health in self.proxies.items()}
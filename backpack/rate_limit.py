@@ -0,0 +1,141 @@
+import asyncio
+from time import monotonic
+
+# requests per second allowed for one API key, one proxy and one endpoint (over all accounts)
+key_rate = 5
+proxy_rate = 10
+endpoint_rate = 50
+# part of the base rate kept after a throttled response, and regained per second afterwards
+throttle_factor = 0.5
+recovery_per_second = 0.05
+# lowest share of the base rate a bucket can be throttled down to
+min_rate_share = 0.05
+# response statuses treated as throttling
+throttle_statuses = (429, 503)
+
+
+class TokenBucket:
+    """
+        Token bucket whose rate halves on throttling and grows back to the base rate over time.
+
+        Attributes:
+            base_rate (float): Tokens per second when the API is not throttling.
+            rate (float): The current tokens per second.
+            capacity (float): The maximum burst size.
+            throttled (int): The number of throttled responses seen.
+        """
+    def __init__(self, base_rate: float, capacity: float | None = None):
+        self.base_rate = base_rate
+        self.rate = base_rate
+        self.capacity = capacity or max(1.0, base_rate)
+        self.tokens = self.capacity
+        self.throttled = 0
+        self._updated = monotonic()
+
+    def _refill(self):
+        now = monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self.rate = min(self.base_rate, self.rate + self.base_rate * recovery_per_second * elapsed)
+        self.tokens = min(self.capacity, self.tokens + self.rate * elapsed)
+
+    async def acquire(self):
+        """
+            Waits until a token is available and takes it.
+
+            Returns:
+                None
+            """
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def throttle(self):
+        """
+            Tightens the bucket after a throttled response.
+
+            Returns:
+                None
+            """
+        self._refill()
+        self.throttled += 1
+        self.rate = max(self.base_rate * min_rate_share, self.rate * throttle_factor)
+        self.tokens = min(self.tokens, 0)
+
+
+class RateLimiter:
+    """
+        Rate limits every request by API key, proxy and endpoint at once.
+
+        Attributes:
+            key_rate (float): Base requests per second of one API key.
+            proxy_rate (float): Base requests per second through one proxy.
+            endpoint_rate (float): Base requests per second to one endpoint over all accounts.
+        """
+    def __init__(self, key_rate: float = key_rate,
+                 proxy_rate: float = proxy_rate,
+                 endpoint_rate: float = endpoint_rate):
+        self.key_rate = key_rate
+        self.proxy_rate = proxy_rate
+        self.endpoint_rate = endpoint_rate
+        self._buckets = {}
+
+    def _bucket(self, kind: str, name, rate: float) -> TokenBucket:
+        bucket = self._buckets.get((kind, name))
+        if bucket is None:
+            bucket = self._buckets[(kind, name)] = TokenBucket(rate)
+        return bucket
+
+    def _buckets_for(self, api_key: str, proxy: str | None, endpoint: str) -> tuple:
+        return (self._bucket("key", api_key, self.key_rate),
+                self._bucket("proxy", proxy, self.proxy_rate),
+                self._bucket("endpoint", endpoint, self.endpoint_rate))
+
+    async def acquire(self, api_key: str, proxy: str | None, endpoint: str):
+        """
+            Waits for a token of the key, proxy and endpoint buckets.
+
+            Args:
+                api_key (str): The public key the request is signed with.
+                proxy (str | None): The proxy the request goes through.
+                endpoint (str): The endpoint path.
+
+            Returns:
+                None
+            """
+        for bucket in self._buckets_for(api_key, proxy, endpoint):
+            await bucket.acquire()
+
+    def feedback(self, api_key: str, proxy: str | None, endpoint: str, status: int, overloaded: bool = False):
+        """
+            Tightens the buckets of the request when the API throttled it.
+
+            Args:
+                api_key (str): The public key the request is signed with.
+                proxy (str | None): The proxy the request goes through.
+                endpoint (str): The endpoint path.
+                status (int): The HTTP status of the response.
+                overloaded (bool): True when the body reported an overload.
+
+            Returns:
+                None
+            """
+        if status in throttle_statuses or overloaded:
+            for bucket in self._buckets_for(api_key, proxy, endpoint):
+                bucket.throttle()
+
+    def stats(self) -> dict:
+        """
+            Returns the current rate and throttle count of every bucket.
+
+            Returns:
+                dict: "kind:name" -> {"rate": float, "throttled": int}
+            """
+        return {f"{kind}:{name}": {"rate": bucket.rate, "throttled": bucket.throttled}
+                for (kind, name), bucket in self._buckets.items()}
+
+
+rate_limiter = RateLimiter()
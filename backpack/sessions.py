@@ -0,0 +1,69 @@
+import aiohttp
+
+# connector defaults, shared by every pooled session
+connection_limit = 100
+connection_limit_per_host = 20
+dns_cache_ttl = 300
+keepalive_timeout = 60
+
+
+class SessionPool:
+    """
+        Keeps one long-lived aiohttp session per proxy so keep-alive connections
+        are reused between orders instead of doing a new TCP+TLS handshake every call.
+
+        Attributes:
+            limit (int): Total number of simultaneous connections per session.
+            limit_per_host (int): Number of simultaneous connections to one host.
+            ttl_dns_cache (int): Seconds to keep resolved DNS entries.
+            keepalive_timeout (int): Seconds to keep an idle connection open.
+            trace_configs (list): Optional aiohttp trace configs attached to new sessions.
+        """
+    def __init__(self, limit: int = connection_limit,
+                 limit_per_host: int = connection_limit_per_host,
+                 ttl_dns_cache: int = dns_cache_ttl,
+                 keepalive_timeout: int = keepalive_timeout,
+                 trace_configs: list | None = None):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.trace_configs = trace_configs or []
+        self._sessions = {}
+
+    def get(self, proxy: str | None) -> aiohttp.ClientSession:
+        """
+            Returns the session bound to the proxy, creating it on first use.
+
+            Args:
+                proxy (str | None): The proxy URL the session is dedicated to.
+
+            Returns:
+                aiohttp.ClientSession: An open session with a keep-alive connector.
+            """
+        session = self._sessions.get(proxy)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit,
+                                             limit_per_host=self.limit_per_host,
+                                             ttl_dns_cache=self.ttl_dns_cache,
+                                             keepalive_timeout=self.keepalive_timeout)
+            session = aiohttp.ClientSession(connector=connector,
+                                            trace_configs=self.trace_configs)
+            self._sessions[proxy] = session
+        return session
+
+    async def close(self):
+        """
+            Closes every pooled session and its connector.
+
+            Returns:
+                None
+            """
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+
+
+session_pool = SessionPool()
@@ -0,0 +1,135 @@
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library encoder is used without it
+    orjson = None
+
+# sign in a thread pool instead of on the event loop, for runs with many accounts
+offload_signing = False
+signing_threads = 4
+
+_executor = None
+
+
+def dumps(params: dict) -> bytes:
+    """
+        Serializes a request body with orjson when it is installed.
+
+        Args:
+            params (dict): The body parameters.
+
+        Returns:
+            bytes: The compact JSON body.
+        """
+    if orjson is not None:
+        return orjson.dumps(params)
+    return json.dumps(params, separators=(",", ":")).encode()
+
+
+def signing_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=signing_threads, thread_name_prefix="signing")
+    return _executor
+
+
+def _sign_value(value) -> str:
+    # the signed string must spell booleans the way the JSON body does
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return str(value)
+
+
+def _canonical(params: dict, instruction: str) -> list:
+    parts = [f"instruction={instruction}"] if instruction else []
+    parts.extend(f"{key}={_sign_value(params[key])}" for key in sorted(params))
+    return parts
+
+
+class RequestBuilder:
+    """
+        Signs requests of one account, reusing its header template.
+
+        Attributes:
+            public_key (str): The public key for API access.
+            private_key (Ed25519PrivateKey): The private key for signing requests.
+            window (int): The time window for the signature validity.
+        """
+    def __init__(self, public_key: str, private_key, window: int):
+        self.public_key = public_key
+        self.private_key = private_key
+        self.window = window
+        self._suffix = f"&window={window}"
+        self._template = {
+            "X-API-Key": public_key,
+            "X-Window": str(window),
+            "Content-Type": "application/json; charset=utf-8",
+        }
+
+    def headers(self, params: dict, instruction: str, timestamp: int | None = None,
+                window: int | None = None) -> dict:
+        """
+            Signs the canonical (sorted) parameters and returns the request headers.
+
+            Args:
+                params (dict): The parameters that will be included in the request.
+                instruction (str): The instruction to be included in the signature.
+                timestamp (int | None): Milliseconds to sign with, the local clock when None.
+                window (int | None): The signature window, self.window when None.
+
+            Returns:
+                dict: The headers including the API key, signature, timestamp, and content type.
+            """
+        return self._signed_headers(_canonical(params, instruction), timestamp, window)
+
+    def _signed_headers(self, parts: list, timestamp: int | None, window: int | None) -> dict:
+        if timestamp is None:
+            timestamp = int(time() * 1e3)
+        parts.append(f"timestamp={timestamp}")
+        sign_str = "&".join(parts) + (self._suffix if window is None or window == self.window
+                                      else f"&window={window}")
+        headers = self._template.copy()
+        headers["X-Signature"] = base64.b64encode(self.private_key.sign(sign_str.encode())).decode()
+        headers["X-Timestamp"] = str(timestamp)
+        if window is not None:
+            headers["X-Window"] = str(window)
+        return headers
+
+    def build(self, params: dict, instruction: str, timestamp: int | None = None,
+              window: int | None = None) -> tuple:
+        """
+            Signs the parameters and serializes them as the request body.
+
+            Args:
+                params (dict): The body parameters.
+                instruction (str): The instruction to be included in the signature.
+                timestamp (int | None): Milliseconds to sign with, the local clock when None.
+                window (int | None): The signature window, self.window when None.
+
+            Returns:
+                tuple: (headers, body bytes)
+            """
+        return self.headers(params, instruction, timestamp, window), dumps(params)
+
+    def build_batch(self, orders: list, instruction: str, timestamp: int | None = None,
+                    window: int | None = None) -> tuple:
+        """
+            Signs several orders at once, every order prefixed with the instruction, as /api/v1/orders expects.
+
+            Args:
+                orders (list): The body parameters of every order.
+                instruction (str): The instruction of each order.
+                timestamp (int | None): Milliseconds to sign with, the local clock when None.
+                window (int | None): The signature window, self.window when None.
+
+            Returns:
+                tuple: (headers, body bytes of the JSON array)
+            """
+        parts = [part for params in orders for part in _canonical(params, instruction)]
+        return self._signed_headers(parts, timestamp, window), dumps(orders)
@@ -0,0 +1,261 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+from time import monotonic
+from loguru import logger
+
+# seconds between two reports of a worker process
+report_interval = 10
+# seconds to wait before restarting a crashed worker process, doubled after every failed start
+restart_delay = 5
+max_restart_delay = 300
+# a worker process that exits within stable_time seconds failed to start,
+# the shard is given up after max_restarts failed starts in a row
+stable_time = 60
+max_restarts = 8
+
+
+def shard_accounts(accounts: list, processes: int) -> list:
+    """
+        Splits the accounts round-robin between the worker processes.
+
+        Args:
+            accounts (list): (public_key, private_key, proxy) tuples.
+            processes (int): The number of worker processes.
+
+        Returns:
+            list: One non-empty list of accounts per worker process.
+        """
+    shards = [accounts[shard::processes] for shard in range(processes)]
+    return [shard for shard in shards if shard]
+
+
+def shard_path(path: str, shard_id: int) -> str:
+    """
+        Returns the file one worker process writes in place of path, data/m.json -> data/m.shard-1.json.
+
+        Args:
+            path (str): The file the main process would write.
+            shard_id (int): The worker process.
+
+        Returns:
+            str: The file of the worker process.
+        """
+    root, extension = os.path.splitext(path)
+    return f"{root}.shard-{shard_id}{extension}"
+
+
+def _worker_main(shard_id: int, accounts: list, proxies: list, trade_config: dict, settings: dict, reports):
+    asyncio.run(_run_shard(shard_id, accounts, proxies, trade_config, settings, reports))
+
+
+async def _run_shard(shard_id: int, accounts: list, proxies: list, trade_config: dict, settings: dict, reports):
+    from backpack.clock import server_clock
+    from backpack.market_data import MarketDataFeed
+    from backpack.metrics import metrics, serve as serve_metrics, dump_periodically as dump_metrics
+    from backpack.open_orders import share_trackers
+    from backpack.orders import share_batchers
+    from backpack.proxies import ProxyManager, probe_path
+    from backpack import signing
+    from backpack.sessions import session_pool
+    from backpack.trader import Trade
+    from backpack.worker import WorkerPool, symbol_trades
+    from utils import log
+
+    if not proxies:
+        raise RuntimeError(f"Shard {shard_id} has no proxy, its accounts would trade direct")
+    # a spawned process starts with loguru's default handler, disabled metrics and signing on the loop
+    signing.offload_signing = settings.get("offload_signing", False)
+    logged = settings.get("queued_logs") or settings.get("log_json")
+    if logged:
+        log.configure(queued=settings.get("queued_logs", False), json_path=settings.get("log_json"))
+    logger.configure(extra={"shard": shard_id})
+    background = []
+    runner = None
+    if settings.get("metrics_port") or settings.get("metrics_json"):
+        metrics.enable()
+    if settings.get("metrics_port"):
+        runner = await serve_metrics(settings["metrics_port"] + 1 + shard_id)
+    if settings.get("metrics_json"):
+        background.append(asyncio.create_task(dump_metrics(shard_path(settings["metrics_json"], shard_id))))
+
+    trade_config = dict(trade_config)
+    batch_orders = trade_config.pop("batch_orders", False)
+    track_orders = trade_config.pop("track_orders", False)
+    symbols = trade_config.pop("symbols")
+    # every process sees the same public trades, one of them records the tapes
+    feed = MarketDataFeed(record_dir=settings.get("record_tapes") if shard_id == 0 else None)
+    # every shard routes over all the proxies, a shard of accounts without a proxy line of their own
+    # would otherwise get an empty manager
+    proxies = ProxyManager(proxies, (trade_config.get("api_url") or Trade.API_URL) + probe_path)
+    await proxies.check_all()
+    proxies.start()
+    trades = symbol_trades(accounts, symbols, feed=feed, proxy_manager=proxies, **trade_config)
+    if batch_orders:
+        share_batchers(trades)
+    trackers = share_trackers(trades) if track_orders else {}
+    pool = WorkerPool(trades)
+    pool.start()
+    try:
+        while True:
+            await asyncio.sleep(report_interval)
+            report = _shard_report(pool)
+            report["signature_rejections"] = server_clock.rejections
+            reports.put((shard_id, report))
+    finally:
+        await pool.stop(timeout=5)
+        for tracker in trackers.values():
+            tracker.stop()
+        proxies.stop()
+        feed.close()
+        await session_pool.close()
+        for task in background:
+            task.cancel()
+        if runner is not None:
+            await runner.cleanup()
+        metrics.disable()
+        if logged:
+            await log.shutdown()
+
+
+def _shard_report(pool) -> dict:
+    report = {"accounts": len({trade.public_key for trade in pool.trades}), "volume": pool.volume,
+              "cycles": pool.cycles, "filled": 0, "new": 0, "expired": 0, "errors": 0, "prefetch_hits": 0,
+              "latency_saved": pool.latency_saved}
+    # the loops of a Trade share its counters
+    for trade in pool.trades:
+        outcomes = trade.outcomes
+        report["filled"] += outcomes["Filled"]
+        report["new"] += outcomes["New"]
+        report["expired"] += outcomes["Expired"]
+        report["errors"] += outcomes["error"]
+        report["prefetch_hits"] += trade.prefetch_hits
+    return report
+
+
+class Supervisor:
+    """
+        Spreads the accounts over several processes, each running its own event loop.
+
+        Worker processes report their cumulative counters through a queue, the
+        supervisor sums them up and restarts any process that exits.
+
+        Attributes:
+            shards (list): The accounts of every worker process.
+            proxies (list): Every configured proxy, each worker process routes its accounts over all of them.
+            trade_config (dict): The symbol_plan entries under "symbols", the rest is passed to every Trade.
+            settings (dict): Process settings the workers apply themselves: record_tapes (recorded by
+                shard 0), queued_logs, log_json (shared file), metrics_port (shard N serves port + 1 + N),
+                metrics_json (one shard_path file per shard) and offload_signing.
+            totals (dict): The last aggregated report over all processes.
+        """
+    def __init__(self, public_keys: list, private_keys: list, proxies: list, processes: int,
+                 settings: dict | None = None, **trade_config):
+        self.proxies = list(dict.fromkeys(proxy for proxy in proxies if proxy is not None))
+        if not self.proxies:
+            raise ValueError("At least one proxy is required, the accounts would trade direct")
+        self.shards = shard_accounts(list(zip(public_keys, private_keys, proxies)), processes)
+        self.trade_config = trade_config
+        self.settings = settings or {}
+        self.totals = {}
+        self._context = multiprocessing.get_context("spawn")
+        self._reports = self._context.Queue()
+        self._processes = {}
+        self._last = {}
+        self._carried = {}
+        self._started_at = {}
+        self._failures = {}
+        self._restart_at = {}
+        self._given_up = set()
+
+    def _spawn(self, shard_id: int):
+        process = self._context.Process(target=_worker_main,
+                                        args=(shard_id, self.shards[shard_id], self.proxies, self.trade_config,
+                                              self.settings, self._reports),
+                                        name=f"backpack-shard-{shard_id}",
+                                        daemon=True)
+        process.start()
+        self._processes[shard_id] = process
+        self._started_at[shard_id] = monotonic()
+        logger.info(f"Shard {shard_id} started with {len(self.shards[shard_id])} accounts, pid {process.pid}")
+
+    def _restart_dead(self):
+        for shard_id, process in list(self._processes.items()):
+            if process.is_alive() or shard_id in self._given_up:
+                continue
+            if shard_id not in self._restart_at:
+                self._schedule_restart(shard_id, process)
+            elif monotonic() >= self._restart_at[shard_id]:
+                del self._restart_at[shard_id]
+                self._spawn(shard_id)
+        if len(self._given_up) == len(self.shards):
+            raise RuntimeError(f"Every worker process kept exiting after {max_restarts} restarts in a row")
+
+    def _schedule_restart(self, shard_id: int, process):
+        # keep what the crashed process reported, its counters start from zero again
+        last = self._last.pop(shard_id, {})
+        carried = self._carried.setdefault(shard_id, {})
+        for key, value in last.items():
+            if key != "accounts":
+                carried[key] = carried.get(key, 0) + value
+        ran = monotonic() - self._started_at[shard_id]
+        # a bad key or an unreachable proxy kills the process right after every start
+        failures = self._failures[shard_id] = self._failures.get(shard_id, 0) + 1 if ran < stable_time else 1
+        if failures > max_restarts:
+            self._given_up.add(shard_id)
+            logger.critical(f"Shard {shard_id} exited with code {process.exitcode} after {failures - 1} restarts "
+                            f"in a row, its {len(self.shards[shard_id])} accounts are no longer traded")
+            return
+        delay = min(max_restart_delay, restart_delay * 2 ** (failures - 1))
+        self._restart_at[shard_id] = monotonic() + delay
+        logger.error(f"Shard {shard_id} exited with code {process.exitcode} after {ran:.0f}s, "
+                     f"restart {failures}/{max_restarts} in {delay}s")
+
+    def _aggregate(self) -> dict:
+        totals = {}
+        for report in list(self._carried.values()) + list(self._last.values()):
+            for key, value in report.items():
+                if key != "accounts":
+                    totals[key] = totals.get(key, 0) + value
+        totals["accounts"] = sum(len(shard) for shard in self.shards)
+        totals["processes"] = sum(process.is_alive() for process in self._processes.values())
+        return totals
+
+    async def run(self):
+        """
+            Starts every worker process and supervises them until cancelled.
+
+            Returns:
+                None
+            """
+        for shard_id in range(len(self.shards)):
+            self._spawn(shard_id)
+        try:
+            while True:
+                try:
+                    shard_id, report = await asyncio.to_thread(self._reports.get, True, restart_delay)
+                    self._last[shard_id] = report
+                    self.totals = self._aggregate()
+                    logger.info(f"Total volume: {self.totals['volume']:.2f}, cycles: {self.totals['cycles']}, "
+                                f"filled: {self.totals['filled']}, errors: {self.totals['errors']}, "
+                                f"saved per cycle: {self.totals['latency_saved'] / max(1, self.totals['cycles']):.3f}s, "
+                                f"processes: {self.totals['processes']}/{len(self.shards)}")
+                except queue.Empty:
+                    pass
+                self._restart_dead()
+        finally:
+            self.stop()
+
+    def stop(self):
+        """
+            Terminates every worker process.
+
+            Returns:
+                None
+            """
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes.values():
+            process.join(timeout=5)
@@ -1,18 +1,33 @@
-import aiohttp
-from aiohttp.client_exceptions import ContentTypeError
+from aiohttp.client_exceptions import ContentTypeError, ClientError
 from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 import base64
-import json
-import requests
 from loguru import logger
 from enums.request_enums import *
-from time import time
+from backpack.sessions import session_pool, SessionPool
+from backpack.market_data import MarketDataFeed
+from backpack.rate_limit import rate_limiter, RateLimiter
+from backpack.proxies import ProxyManager
+from backpack.orders import OrderBatcher
+from backpack.open_orders import OpenOrderTracker
+from backpack.clock import server_clock, ServerClock, REJECTION_MARKERS
+from backpack.metrics import metrics
+from backpack.markets import API_URL, snap_quantity
+from backpack import signing
+from backpack.signing import RequestBuilder
+from time import perf_counter, time
+from collections import Counter
 from utils.helpers import (random_quantity,
                            random_sleep_time,
+                           backoff_time,
+                           max_leg_retries,
+                           prefetch_max_age,
                            middle_ask_price,
                            middle_bid_price)
 import asyncio
 
+# lowercase words of a plain text response that mean the API is throttling us
+OVERLOAD_MARKERS = ("overload", "too many requests", "rate limit")
+
 
 async def _handle_post(self, params):
     """
@@ -24,15 +39,8 @@ async def _handle_post(self, params):
         Returns:
             dict or str: The JSON response as a dictionary if the content type is JSON, otherwise the response text.
         """
-    async with aiohttp.ClientSession() as session:
-        async with session.post("https://api.backpack.exchange/api/v1/order",
-                                headers=(await self.headers(params=params,
-                                                            instruction=Instruction.ORDER_EXECUTE.value)),
-                                data=json.dumps(params), proxy=self.proxy) as response:
-            try:
-                return await response.json()
-            except ContentTypeError:
-                return await response.text()
+    return await self._request("POST", "/api/v1/order",
+                               sign=(self.request_builder.build, params, Instruction.ORDER_EXECUTE.value))
 
 
 class Site:
@@ -43,80 +51,210 @@ class Site:
             WINDOW (int): The time window for the signature validity.
             public_key (str): The public key for API access.
             private_key (Ed25519PrivateKey): The private key for signing requests.
-            proxy (str): The proxy URL to be used for requests.
+            proxy (str): The proxy URL the next request goes through.
+            session_pool (SessionPool): The pool that owns the keep-alive session for the proxy.
+            proxy_manager (ProxyManager | None): Routes requests around unhealthy proxies, the configured proxy is always used when None.
+            rate_limiter (RateLimiter): The limiter every request of the account goes through.
+            API_URL (str): The base URL of the exchange, override it to target another server.
+            request_builder (RequestBuilder): Signs requests with the account's header template.
+            clock (ServerClock): Corrects the signature timestamp and sizes the window per proxy.
         """
     WINDOW = 5000
+    API_URL = API_URL
 
-    def __init__(self, token, private_key, proxy):
+    def __init__(self, token, private_key, proxy, pool: SessionPool = session_pool,
+                 limiter: RateLimiter = rate_limiter, api_url: str | None = None,
+                 proxy_manager: ProxyManager | None = None, clock: ServerClock = server_clock,
+                 request_builder: RequestBuilder | None = None):
         self.public_key = token
-        self.private_key = self.private_key = Ed25519PrivateKey.from_private_bytes(
-            base64.b64decode(private_key)
-        )
-        self.proxy = proxy
+        if request_builder is not None:
+            # another Site of the account already decoded the key
+            self.private_key = request_builder.private_key
+        else:
+            self.private_key = Ed25519PrivateKey.from_private_bytes(base64.b64decode(private_key))
+        self._proxy = proxy
+        self.proxy_manager = proxy_manager
+        self.request_builder = request_builder or RequestBuilder(self.public_key, self.private_key, self.WINDOW)
+        self.session_pool = pool
+        self.rate_limiter = limiter
+        self.clock = clock
+        if api_url is not None:
+            self.API_URL = api_url
+
+    @property
+    def proxy(self) -> str | None:
+        if self.proxy_manager is None:
+            return self._proxy
+        return self.proxy_manager.route(self.public_key, self._proxy)
+
+    @property
+    def session(self):
+        return self.session_pool.get(self.proxy)
+
+    async def _request(self, method: str, path: str, with_status: bool = False, with_times: bool = False,
+                       sign: tuple | None = None, **kwargs):
+        """
+                Sends a request through the rate limiter and the pooled session of the proxy.
+
+                Args:
+                    method (str): The HTTP method.
+                    path (str): The endpoint path, appended to API_URL.
+                    with_status (bool): Return the HTTP status along with the response.
+                    with_times (bool): Return the local times in milliseconds the request was sent
+                        and its response read, the rate limiter wait excluded.
+                    sign (tuple | None): (build, payload, instruction) of a signed request, build is a
+                        RequestBuilder method returning the headers, or (headers, body). It is called once
+                        the rate limiter let the request through, so the wait never eats the signature window.
+                    **kwargs: Passed to aiohttp (headers, params, data).
+
+                Returns:
+                    dict or str: The JSON response if the content type is JSON, otherwise the response text,
+                        in a (response, status) tuple when with_status is set, (response, sent, received)
+                        when with_times is set.
+        """
+        proxy = self.proxy
+        await self.rate_limiter.acquire(self.public_key, proxy, path)
+        if sign is not None:
+            # the window is sized for the proxy the request is sent through, picked once above
+            signed = await self._signed(proxy, *sign)
+            if isinstance(signed, tuple):
+                kwargs["headers"], kwargs["data"] = signed
+            else:
+                kwargs["headers"] = signed
+        with metrics.timer("request_seconds", (("endpoint", path),)):
+            sent = time() * 1e3
+            started = perf_counter()
+            try:
+                async with self.session_pool.get(proxy).request(method, self.API_URL + path, proxy=proxy,
+                                                                **kwargs) as response:
+                    try:
+                        result = await response.json()
+                    except ContentTypeError:
+                        result = await response.text()
+            except (ClientError, asyncio.TimeoutError):
+                if self.proxy_manager is not None:
+                    self.proxy_manager.report(proxy, None, False)
+                raise
+            elapsed = perf_counter() - started
+            received = sent + elapsed * 1e3
+            if self.proxy_manager is not None:
+                # 407 and gateway errors come from the proxy, not from the exchange
+                self.proxy_manager.report(proxy, elapsed, response.status not in (407, 502, 504))
+            self.clock.observe(proxy, elapsed)
+            if response.status in (400, 401):
+                message = result.get("message", "") if isinstance(result, dict) else str(result)
+                if any(word in message.lower() for word in REJECTION_MARKERS):
+                    signed_at = (kwargs.get("headers") or {}).get("X-Timestamp")
+                    self.clock.rejected(message, int(signed_at) if signed_at else None)
+            metrics.inc("responses_total", labels=(("endpoint", path), ("status", response.status)))
+            overloaded = isinstance(result, (str, dict)) and len(result) < 2 or \
+                isinstance(result, str) and any(word in result.lower() for word in OVERLOAD_MARKERS)
+            self.rate_limiter.feedback(self.public_key, proxy, path, response.status, overloaded)
+            if with_times:
+                return result, sent, received
+            return (result, response.status) if with_status else result
 
-    async def headers(self, params: dict, instruction: str) -> dict:
+    async def _signed(self, proxy: str | None, build, *args):
+        # signs with the server clock and the window of the proxy, in the signing pool when offloaded
+        await self.clock.ensure_synced(self)
+        timestamp, window = self.clock.now(), self.clock.window(proxy)
+        with metrics.timer("sign_seconds"):
+            if signing.offload_signing:
+                return await asyncio.get_running_loop().run_in_executor(
+                    signing.signing_executor(), build, *args, timestamp, window)
+            return build(*args, timestamp, window)
+
+    async def execute_order(self, params: dict):
         """
-                Generates the headers required for a request, including the signature.
+                Places one order through /api/v1/order.
 
                 Args:
-                    params (dict): The parameters that will be included in the request.
-                    instruction (str): The instruction to be included in the signature.
+                    params (dict): The order parameters.
 
                 Returns:
-                    dict: The headers including the API key, signature, timestamp, and content type.
-        """
-        sign_str = f"instruction={instruction}" if instruction else ""
-        sorted_params = "&".join(
-            f"{key}={value}" for key, value in sorted(params.items())
-        )
-        if sorted_params:
-            sign_str += "&" + sorted_params
-        timestamp = int(time() * 1e3)
-        sign_str += f"&timestamp={timestamp}&window={self.WINDOW}"
-        signature_bytes = self.private_key.sign(sign_str.encode())
-        encoded_signature = base64.b64encode(signature_bytes).decode()
-        headers = {
-            "X-API-Key": self.public_key,
-            "X-Signature": encoded_signature,
-            "X-Timestamp": str(timestamp),
-            "X-Window": str(self.WINDOW),
-            "Content-Type": "application/json; charset=utf-8",
-        }
-        return headers
-
-    async def _sign(self, data):
-        signature = self.private_key.sign(data.encode())
-        signature_base64 = base64.b64encode(signature).decode()
-        return str(signature_base64)
-
-    @staticmethod
-    def get_markets():
-        response = requests.get("https://api.backpack.exchange/api/v1/markets")
-        return response.json()
+                    dict or str: The order, or the error text.
+        """
+        return await _handle_post(self=self, params=params)
+
+    async def execute_orders(self, orders: list) -> tuple:
+        """
+                Places several orders in one signed request through /api/v1/orders.
+
+                Args:
+                    orders (list): The parameters of every order.
+
+                Returns:
+                    tuple: (list of orders or errors in the order of `orders`, or the error text; HTTP status)
+        """
+        return await self._request("POST", "/api/v1/orders", with_status=True,
+                                   sign=(self.request_builder.build_batch, orders, Instruction.ORDER_EXECUTE.value))
+
+    async def server_time(self, with_times: bool = False):
+        """
+                Returns the exchange clock in milliseconds, from /api/v1/time.
+
+                Args:
+                    with_times (bool): Also return the local times the request was sent and answered.
+
+                Returns:
+                    int | tuple: The server time, or (server time, sent, received) when with_times is set.
+        """
+        if with_times:
+            server, sent, received = await self._request("GET", "/api/v1/time", with_times=True)
+            return int(server), sent, received
+        return int(await self._request("GET", "/api/v1/time"))
 
     async def get_order_history(self, symbol):
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://api.backpack.exchange/api/v1/trades",
-                                   headers=await self.headers({"symbol": symbol},
-                                                              "fillHistoryQueryAll"),
-                                   params={"symbol": symbol}, proxy=self.proxy) as response:
-                try:
-                    return await response.json()
-                except ContentTypeError:
-                    print(await response.text())
-
-    async def get_user_order_history(self):
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://api.backpack.exchange/wapi/v1/history/fills",
-                                   headers=await self.headers({"limit": 999},
-                                                              "fillHistoryQueryAll"),
-                                   params={"limit": 999}, proxy=self.proxy) as response:
-                try:
-                    return await response.json()
-                except ContentTypeError:
-                    logger.error("Backpack api is shit so try few more times")
-                    return await response.text()
+        r = await self._request("GET", "/api/v1/trades",
+                                sign=(self.request_builder.headers, {"symbol": symbol}, "fillHistoryQueryAll"),
+                                params={"symbol": symbol})
+        if isinstance(r, str):
+            print(r)
+            return None
+        return r
 
+    async def get_user_order_history(self, limit: int = 999, offset: int = 0):
+        params = {"limit": limit, "offset": offset} if offset else {"limit": limit}
+        r = await self._request("GET", "/wapi/v1/history/fills",
+                                sign=(self.request_builder.headers, params, "fillHistoryQueryAll"),
+                                params=params)
+        if isinstance(r, str):
+            logger.error("Backpack api is shit so try few more times")
+        return r
+
+    async def get_open_orders(self, symbol: str | None = None):
+        """
+                Returns the open orders of the account, of every symbol when none is given.
+
+                Returns:
+                    list or str: The open orders, or the error text.
+        """
+        params = {"symbol": symbol} if symbol else {}
+        return await self._request("GET", "/api/v1/orders",
+                                   sign=(self.request_builder.headers, params, Instruction.ORDER_QUERY_ALL.value),
+                                   params=params)
+
+    async def cancel_order(self, symbol: str, order_id: str):
+        """
+                Cancels one open order of the account.
+
+                Returns:
+                    dict or str: The cancelled order, or the error text.
+        """
+        return await self._request("DELETE", "/api/v1/order",
+                                   sign=(self.request_builder.build, {"orderId": order_id, "symbol": symbol},
+                                         Instruction.ORDER_CANCEL.value))
+
+    async def cancel_all(self, symbol: str):
+        """
+                Cancels every open order of the account on the symbol in one request.
+
+                Returns:
+                    list or str: The cancelled orders, or the error text.
+        """
+        return await self._request("DELETE", "/api/v1/orders",
+                                   sign=(self.request_builder.build, {"symbol": symbol},
+                                         Instruction.ORDER_CANCEL_ALL.value))
 
 
 class Trade(Site):
@@ -126,11 +264,25 @@ class Trade(Site):
         Attributes:
             public_key (str): The public key for API access.
             private_key (str): The private key for signing requests.
+            min_quantity (float): The lower bound of the random quantity.
+            max_quantity (float): The upper bound of the random quantity.
             quantity (float): The quantity to trade.
             symbol (str): The trading symbol.
             volume (float): The total volume traded.
             time_in_force (str): The time in force policy for the order.
-            proxy (str): The proxy URL to be used for requests.
+            proxy (str): The proxy URL the next request goes through.
+            feed (MarketDataFeed | None): Shared trade tape cache, trade history is fetched directly when None.
+            outcomes (Counter): Number of orders per outcome (New/Filled/Expired/error).
+            state_counts (Counter): Number of times each OrderState was passed through.
+            state_seconds (Counter): Seconds spent in each OrderState.
+            pipeline (bool): Prefetch the sell price while the buy is in flight and during the pair sleep.
+            prefetch_hits (int): Sell legs submitted with a prefetched price.
+            latency_saved (float): Seconds of price fetching taken off the sell legs by prefetching.
+            batcher (OrderBatcher | None): Sends the orders of the account in batches, one request per order when None.
+            open_orders (OpenOrderTracker | None): Reconciles the orders that rest in the book, untracked when None.
+            market (dict | None): The market_filters entry of the symbol, quantities are snapped to its step size.
+            loops (int): Concurrent buy/sell loops WorkerPool runs over this Trade, each with its own quantity.
+            unsold (list): Quantities bought by cycles whose sell leg gave up, sold again before the next buy.
         """
     def __init__(self, public_key: str,
                  private_key: str,
@@ -138,102 +290,310 @@ class Trade(Site):
                  max_quantity: float | int,
                  symbol: str,
                  time_in_force: str,
-                 proxy: str):
+                 proxy: str,
+                 pool: SessionPool = session_pool,
+                 feed: MarketDataFeed | None = None,
+                 limiter: RateLimiter = rate_limiter,
+                 api_url: str | None = None,
+                 proxy_manager: ProxyManager | None = None,
+                 pipeline: bool = False,
+                 batcher: OrderBatcher | None = None,
+                 open_orders: OpenOrderTracker | None = None,
+                 market: dict | None = None,
+                 loops: int = 1,
+                 request_builder: RequestBuilder | None = None):
 
-        super().__init__(public_key, private_key, proxy)
-        self.quantity = random_quantity(min_quantity, max_quantity)
+        super().__init__(public_key, private_key, proxy, pool, limiter, api_url, proxy_manager,
+                         request_builder=request_builder)
+        self.loops = loops
+        self.unsold = []
+        self.min_quantity = min_quantity
+        self.max_quantity = max_quantity
+        self.market = market
+        self.new_quantity()
         self.symbol = symbol
         self.volume = 0
         self.time_in_force = time_in_force
+        self.feed = feed
+        self.outcomes = Counter()
+        self.state_counts = Counter()
+        self.state_seconds = Counter()
+        self.pipeline = pipeline
+        self.batcher = batcher
+        self.open_orders = open_orders
+        self.prefetch_hits = 0
+        self.latency_saved = 0.0
+        # moving average of a price fetch, to start the prefetch just before the sell is allowed
+        self._fetch_seconds = 0.0
+
+    def new_quantity(self) -> float:
+        """
+                Picks a new random quantity for the next buy/sell cycle.
+
+                Returns:
+                    float: The new quantity.
+        """
+        self.quantity = random_quantity(self.min_quantity, self.max_quantity)
+        if self.market is not None:
+            self.quantity = snap_quantity(self.quantity, self.market)
+        return self.quantity
+
+    async def bid_price(self) -> float:
+        """
+                Returns the median bid price, from the feed's rolling window when a feed is set.
 
-    async def buy_order(self):
+                Returns:
+                    float: The median bid price.
+        """
+        if self.feed is None:
+            order_history = await self.get_order_history(self.symbol)
+            with metrics.timer("median_seconds", (("side", Side.BUY.value),)):
+                return await middle_bid_price(order_history)
+        return await self.feed.bid_price(self.symbol, self)
+
+    async def ask_price(self) -> float:
         """
-                Asynchronously places a buy order at the middle bid price.
+                Returns the median ask price, from the feed's rolling window when a feed is set.
 
                 Returns:
-                    None: The function returns nothing but logs the outcome of the order.
+                    float: The median ask price.
+        """
+        if self.feed is None:
+            order_history = await self.get_order_history(self.symbol)
+            with metrics.timer("median_seconds", (("side", Side.SELL.value),)):
+                return await middle_ask_price(order_history)
+        return await self.feed.ask_price(self.symbol, self)
+
+    async def buy_order(self, quantity: float | None = None) -> OrderStatus | None:
+        """
+                Asynchronously places a buy order at the middle bid price and pairs it with a sell.
+
+                Args:
+                    quantity (float | None): The quantity of the cycle, self.quantity when None. Every loop
+                        over the Trade passes its own, the legs never read one another's.
+
+                Returns:
+                    OrderStatus | None: The status of the last placed order, None when a leg was given up.
+        """
+        quantity = self.quantity if quantity is None else quantity
+        prefetch = asyncio.ensure_future(self._prefetch_ask()) if self.pipeline else None
+        try:
+            status = await self._run_leg(Side.BUY, quantity=quantity)
+            if status is None:
+                return None
+            if status == OrderStatus.FILLED:
+                sleep_time = random_sleep_time()
+                if prefetch is not None and sleep_time > prefetch_max_age:
+                    # the price fetched with the buy is too old after the sleep, fetch it again right before
+                    prefetch.cancel()
+                    prefetch = asyncio.ensure_future(self._prefetch_ask(sleep_time - 2 * self._fetch_seconds))
+                started = perf_counter()
+                await asyncio.sleep(sleep_time)
+                self._track(OrderState.PAIR_SLEEP, started)
+            sold = None
+            try:
+                sold = await self._sell_order(prefetch, quantity)
+            finally:
+                if sold is None and status == OrderStatus.FILLED:
+                    # the bought quantity stays in the account until a later cycle sells it
+                    self.unsold.append(quantity)
+                    logger.warning("{} {} sell gave up, {} is held until it is sold", self.public_key,
+                                   self.symbol, quantity)
+            return sold
+        finally:
+            if prefetch is not None:
+                prefetch.cancel()
+                if prefetch.done() and not prefetch.cancelled():
+                    # a failed prefetch that was never used is not an error of the cycle
+                    prefetch.exception()
+
+    async def sell_unsold(self) -> OrderStatus | None:
+        """
+                Sells the quantity of one cycle whose sell leg gave up, instead of buying again.
+
+                    OrderStatus | None: The status of the sell, None when it gave up again and stays unsold.
+                    OrderStatus | None: The status of the sell, None when it gave up again and the quantity stays unsold.
         """
+        quantity = self.unsold.pop()
+        sold = None
         try:
-            price = await middle_bid_price(await self.get_order_history(self.symbol))
-            params = {
+            sold = await self._sell_order(None, quantity)
+        finally:
+            if sold is None:
+                self.unsold.append(quantity)
+        return sold
+
+    async def _sell_order(self, prefetch: asyncio.Future | None = None,
+                          quantity: float | None = None) -> OrderStatus | None:
+        """
+                Asynchronously places a sell order at the middle ask price.
+
+                Args:
+                    prefetch (asyncio.Future | None): The ask price fetched ahead by buy_order in pipelined mode.
+                    quantity (float | None): The quantity bought by the cycle, self.quantity when None.
+
+                Returns:
+                    OrderStatus | None: The status of the sell, None when the leg was given up.
+        """
+        status = await self._run_leg(Side.SELL, prefetch, quantity)
+        if status == OrderStatus.FILLED:
+            started = perf_counter()
+            await asyncio.sleep(random_sleep_time())
+            self._track(OrderState.PAIR_SLEEP, started)
+        return status
+
+    async def _prefetch_ask(self, delay: float = 0) -> tuple:
+        await asyncio.sleep(max(0.0, delay))
+        started = perf_counter()
+        price = await self.ask_price()
+        fetched = perf_counter()
+        self._fetch_seconds += 0.2 * (fetched - started - self._fetch_seconds)
+        return price, fetched, fetched - started
+
+    async def _leg_price(self, side: Side, prefetch: asyncio.Future | None) -> float:
+        """
+                Returns the price of a leg, taken from the prefetch when it is younger than prefetch_max_age.
+        """
+        if prefetch is not None:
+            waiting = perf_counter()
+            try:
+                price, fetched, seconds = await prefetch
+            except Exception:
+                pass
+            else:
+                if perf_counter() - fetched <= prefetch_max_age:
+                    saved = max(0.0, seconds - (perf_counter() - waiting))
+                    self.prefetch_hits += 1
+                    self.latency_saved += saved
+                    metrics.inc("prefetch_total", labels=(("result", "hit"),))
+                    metrics.observe("prefetch_saved_seconds", saved)
+                    return price
+            metrics.inc("prefetch_total", labels=(("result", "stale"),))
+        started = perf_counter()
+        price = await (self.bid_price() if side == Side.BUY else self.ask_price())
+        self._fetch_seconds += 0.2 * (perf_counter() - started - self._fetch_seconds)
+        return price
+
+    async def _run_leg(self, side: Side, prefetch: asyncio.Future | None = None,
+                       quantity: float | None = None) -> OrderStatus | None:
+        """
+                Runs one leg as a loop of fetch price -> submit -> handle outcome,
+                sleeping with jittered exponential backoff between attempts.
+
+                Args:
+                    side (Side): The side of the leg.
+                    prefetch (asyncio.Future | None): A prefetched price for the first attempt.
+                    quantity (float | None): The quantity of the leg, self.quantity when None.
+
+                Returns:
+                    OrderStatus | None: FILLED or NEW once the order is placed, None when the leg is given up.
+        """
+        quantity = self.quantity if quantity is None else quantity
+        for attempt in range(1, max_leg_retries + 2):
+            try:
+                started = perf_counter()
+                price = await self._leg_price(side, prefetch if attempt == 1 else None)
+                self._track(OrderState.FETCH_PRICE, started)
+                started = perf_counter()
+                params = self._order_params(side, price, quantity)
+                r = await (self.batcher.submit(params) if self.batcher is not None
+                           else _handle_post(self=self, params=params))
+                self._track(OrderState.SUBMIT, started)
+                status = self._handle_outcome(side, price, params, r)
+                if status == OrderStatus.EXPIRED and side == Side.SELL and not (isinstance(r, dict) and len(r) > 2):
+                    # a refused sell is retried a step smaller, the fee may have been taken from the bought quantity
+                    quantity = self._step_down(quantity)
+                    if quantity is None:
+                        status = None
+                outcome = status.value if status is not None else "error"
+            except Exception:
+                logger.error("Bad request, retrying...")
+                outcome = "error"
+                status = OrderStatus.EXPIRED
+            self.outcomes[outcome] += 1
+            metrics.inc("orders_total", labels=(("side", side.value), ("outcome", outcome)))
+            if status != OrderStatus.EXPIRED:
+                return status
+            if attempt <= max_leg_retries:
+                started = perf_counter()
+                await asyncio.sleep(backoff_time(attempt))
+                self._track(OrderState.BACKOFF, started)
+        logger.error("{} order for {} gave up after {} retries", side.value, self.symbol, max_leg_retries)
+        return None
+
+    def _step_down(self, quantity: float) -> float | None:
+        """
+                Returns the quantity one step of the market smaller, None when it would fall below the minimum.
+        """
+        if self.market is None:
+            quantity = round(quantity - 0.01, 2)
+            return quantity if quantity > 0 else None
+        smaller = quantity - self.market["step_size"]
+        if smaller < self.market["min_quantity"] - 1e-9:
+            return None
+        return snap_quantity(smaller, self.market)
+
+    def _order_params(self, side: Side, price: float, quantity: float) -> dict:
+        if side == Side.BUY:
+            return {
                 "orderType": OrderType.LIMIT.value,
                 "price": str(price),
-                "quantity": str(self.quantity),
+                "quantity": str(quantity),
                 "side": Side.BUY.value,
                 "symbol": self.symbol,
                 "timeInForce": self.time_in_force,
                 }
-            r = await _handle_post(self=self, params=params)
-            if isinstance(r, dict) and len(r) > 2:
-                if r["status"] == "Expired":
-                    logger.warning(f"{r['orderType']} {r['side']} order for {r['quantity']} {r['symbol']} "
-                                   f"was not filled with price : {str(price)}")
-                    await asyncio.sleep(3)
-                    await self.buy_order()
-                elif r["status"] == "Filled":
-                    logger.success(f"{r['orderType']} {r['side']} order for {r['quantity']} {r['symbol']} "
-                                   f"was filled with price : {str(price)}")
-                    self.volume += price * self.quantity
-                    logger.success(f"Current {self.public_key} account volume: {str(self.volume)}")
-                    await asyncio.sleep(random_sleep_time())
-                    await self._sell_order()
-                elif r["status"] == "New":
-                    logger.success(f"{r['orderType']} {r['side']} order for {r['quantity']} {r['symbol']} "
-                                   f"was created with price : {str(price)}")
-                    await self._sell_order()
-                else:
-                    logger.error("Unexpected responce"+str(r))
-            elif len(r) < 2:
-                logger.error("API is overloaded")
-            else:
-                if r == "Insufficient funds":
-                    logger.error("Insufficient funds, please change the quantity range")
-                else:
-                    logger.error(f"{r}, check the quantity range and your account funds or contact developer")
-        except Exception:
-            logger.error("Bad request, retrying...")
-            await self.buy_order()
+        return {
+            "orderType": OrderType.LIMIT.value,
+            "price": price,
+            "quantity": str(quantity),
+            "selfTradePrevention": SelfTradePrevention.ALLOW.value,
+            "side": Side.SELL.value,
+            "symbol": self.symbol,
+            "timeInForce": self.time_in_force,
+            }
 
-    async def _sell_order(self):
+    def _handle_outcome(self, side: Side, price: float, params: dict, r) -> OrderStatus | None:
         """
-                Asynchronously places a sell order at the middle ask price.
+                Logs the response of an order and decides what the leg does next.
 
                 Returns:
-                    None: The function returns nothing but logs the outcome of the order.
+                    OrderStatus | None: FILLED or NEW when placed, EXPIRED to retry, None to give up.
         """
-        try:
-            price = await middle_ask_price(await self.get_order_history(self.symbol))
-            params = {
-                "orderType": OrderType.LIMIT.value,
-                "price": price,
-                "quantity": str(self.quantity),
-                "selfTradePrevention": SelfTradePrevention.ALLOW.value,
-                "side": Side.SELL.value,
-                "symbol": self.symbol,
-                "timeInForce": self.time_in_force,
-                }
-            r = await _handle_post(self=self, params=params)
-            if isinstance(r, dict) and len(r) > 2:
-                if r["status"] == "Expired":
-                    logger.warning(f"{r['orderType']} {r['side']} order for {r['quantity']} {r['symbol']} "
-                                   f"was not filled with price : {str(price)}")
-                    await asyncio.sleep(3)
-                    await self._sell_order()
-                elif r["status"] == "Filled":
-                    logger.success(f"{r['orderType']} {r['side']} order for {r['quantity']} {r['symbol']} "
-                                   f"was filled with ask_price: {str(price)}")
-                    self.volume += price * self.quantity
-                    logger.success(f"Current {self.public_key} account volume: {str(self.volume)}")
-                    await asyncio.sleep(random_sleep_time())
-                elif r["status"] == "New":
-                    logger.success(f"{r['orderType']} {r['side']} order for {r['quantity']} {r['symbol']} "
-                                   f"was created with price : {str(price)}")
-            elif len(r) < 2:
-                logger.error("API is overloaded")
-            else:
-                logger.error(r + str(price) + str(params))
-                self.quantity = round(self.quantity - 0.01, 2)
-                await self._sell_order()
-        except Exception:
-            logger.error("Bad request, retrying...")
-            await self._sell_order()
+        if isinstance(r, dict) and len(r) > 2:
+            if r["status"] == OrderStatus.EXPIRED.value:
+                # brace arguments are only formatted when a handler takes the level
+                logger.warning("{} {} order for {} {} was not filled with price : {}",
+                               r["orderType"], r["side"], r["quantity"], r["symbol"], price)
+                return OrderStatus.EXPIRED
+            elif r["status"] == OrderStatus.FILLED.value:
+                quantity = float(params["quantity"])
+                self.volume += price * quantity
+                metrics.inc("volume_total", price * quantity, (("account", self.public_key),))
+                logger.success("{} {} order for {} {} was filled with price : {}, {} account volume: {}",
+                               r["orderType"], r["side"], r["quantity"], r["symbol"], price,
+                               self.public_key, self.volume)
+                return OrderStatus.FILLED
+            elif r["status"] == OrderStatus.NEW.value:
+                logger.success("{} {} order for {} {} was created with price : {}",
+                               r["orderType"], r["side"], r["quantity"], r["symbol"], price)
+                if self.open_orders is not None:
+                    self.open_orders.track(r, params, self)
+                return OrderStatus.NEW
+            logger.error("Unexpected responce{}", r)
+            return None
+        elif len(r) < 2:
+            logger.error("API is overloaded")
+            return None
+        elif side == Side.SELL:
+            logger.error("{}{}{}", r, price, params)
+            return OrderStatus.EXPIRED
+        elif r == "Insufficient funds":
+            logger.error("Insufficient funds, please change the quantity range")
+        else:
+            logger.error("{}, check the quantity range and your account funds or contact developer", r)
+        return None
+
+    def _track(self, state: OrderState, started: float):
+        self.state_counts[state.value] += 1
+        self.state_seconds[state.value] += perf_counter() - started
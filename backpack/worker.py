@@ -0,0 +1,146 @@
+import asyncio
+from loguru import logger
+from backpack.trader import Trade
+from utils.helpers import backoff_time
+
+
+class AccountWorker:
+    """
+        Runs the buy/sell cycle of one account in its own loop.
+
+        The Trade instance (decoded key, pooled session, running volume) lives as
+        long as the worker, so a slow account never holds up the others. A Trade
+        with several loops has one worker per loop, each cycling its own quantity.
+
+        Attributes:
+            trade (Trade): The account and symbol the worker trades with.
+            cycles (int): The number of finished buy/sell cycles.
+            failures (int): Consecutive cycles that gave up a leg or raised, the loop backs off over them.
+        """
+    def __init__(self, trade: Trade):
+        self.trade = trade
+        self.cycles = 0
+        self.failures = 0
+        self._stopping = asyncio.Event()
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> asyncio.Task:
+        """
+            Starts the worker loop if it is not running yet.
+
+            Returns:
+                asyncio.Task: The task running the loop.
+        """
+        if not self.running:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self, timeout: float | None = None):
+        """
+            Lets the current cycle finish and stops the loop, cancelling it after the timeout.
+
+            Args:
+                timeout (float | None): Seconds to wait for the cycle, None waits until it ends.
+        """
+        self._stopping.set()
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def wait(self):
+        if self._task is not None:
+            await self._task
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                if self.trade.unsold:
+                    # inventory of a cycle that could not sell is sold before anything is bought again
+                    completed = await self.trade.sell_unsold() is not None
+                else:
+                    completed = await self.trade.buy_order(self.trade.new_quantity()) is not None
+            except Exception as e:
+                logger.error(f"{self.trade.public_key} cycle failed: {e}")
+                completed = False
+            self.cycles += 1
+            if completed:
+                self.failures = 0
+                continue
+            # a cycle that gave up would start again at once and hammer the exchange and the rate limiter
+            self.failures += 1
+            try:
+                await asyncio.wait_for(self._stopping.wait(), backoff_time(self.failures))
+            except asyncio.TimeoutError:
+                pass
+
+
+class WorkerPool:
+    """
+        Starts and stops the long-lived workers of every account.
+
+        Attributes:
+            trades (list): The Trade instances, each run by trade.loops workers.
+            workers (list): The account workers.
+        """
+    def __init__(self, trades: list):
+        self.trades = trades
+        self.workers = [AccountWorker(trade) for trade in trades for _ in range(trade.loops)]
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    async def stop(self, timeout: float | None = None):
+        await asyncio.gather(*(worker.stop(timeout) for worker in self.workers))
+
+    async def wait(self):
+        await asyncio.gather(*(worker.wait() for worker in self.workers))
+
+    @property
+    def volume(self) -> float:
+        return sum(trade.volume for trade in self.trades)
+
+    @property
+    def cycles(self) -> int:
+        return sum(worker.cycles for worker in self.workers)
+
+    @property
+    def latency_saved(self) -> float:
+        return sum(trade.latency_saved for trade in self.trades)
+
+
+def symbol_trades(accounts: list, symbols: list, **config) -> list:
+    """
+        Creates the Trade instances of every account, one per symbol running weight loops.
+
+        The instances of an account share its decoded key and RequestBuilder and whatever
+        is passed in config (feed, proxy manager, session pool), so more symbols add
+        loops, not connections, key decoding or price fetches.
+
+        Args:
+            accounts (list): (public_key, private_key, proxy) tuples.
+            symbols (list): The symbol_plan entries.
+            **config: Keyword arguments passed to every Trade.
+
+        Returns:
+            list: The Trade instances.
+        """
+    trades = []
+    for public_key, private_key, proxy in accounts:
+        request_builder = None
+        for entry in symbols:
+            trade = Trade(public_key, private_key, entry["min_quantity"], entry["max_quantity"], entry["symbol"],
+                          entry["time_in_force"], proxy, market=entry.get("market"), loops=entry.get("weight", 1),
+                          request_builder=request_builder, **config)
+            request_builder = trade.request_builder
+            trades.append(trade)
+    return trades
@@ -0,0 +1,75 @@
+"""
+    Compares account_volume (pure Python, one account at a time) with the vectorized
+    FillColumns/aggregate path on synthetic fills, built from the API responses and
+    from a Ledger holding the same fills.
+
+    Usage:
+        python -m benchmarks.analytics [fills] [accounts]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from time import perf_counter
+
+from backpack.ledger import Ledger
+from utils.analytics import FillColumns, aggregate
+from utils.helpers import account_volume
+
+SYMBOLS = ("SOL_USDC", "BTC_USDC", "ETH_USDC", "JUP_USDC")
+
+
+def _fills(count: int, accounts: int) -> dict:
+    fills_by_account = {f"account{index}": [] for index in range(accounts)}
+    names = list(fills_by_account)
+    start = 1_700_000_000_000
+    for index in range(count):
+        symbol = random.choice(SYMBOLS)
+        price = random.uniform(1, 100)
+        quantity = random.uniform(0.01, 10)
+        fee_symbol = random.choice(("USDC", symbol.split("_")[0]))
+        fills_by_account[names[index % accounts]].append(
+            {"tradeId": index, "symbol": symbol, "side": random.choice(("Bid", "Ask")),
+             "price": f"{price:.2f}", "quantity": f"{quantity:.2f}",
+             "fee": f"{price * quantity * 0.0008 if fee_symbol == 'USDC' else quantity * 0.0008:.6f}",
+             "feeSymbol": fee_symbol, "orderId": index, "timestamp": start + index * 1000})
+    return fills_by_account
+
+
+async def main(count: int = 1_000_000, accounts: int = 1000):
+    fills_by_account = _fills(count, accounts)
+
+    start = perf_counter()
+    for fills in fills_by_account.values():
+        await account_volume(fills)
+    python_elapsed = perf_counter() - start
+
+    start = perf_counter()
+    columns = FillColumns.from_fills(fills_by_account)
+    load_elapsed = perf_counter() - start
+    start = perf_counter()
+    result = aggregate(columns)
+    aggregate_elapsed = perf_counter() - start
+
+    print(f"account_volume, per account:      {python_elapsed:.3f}s (volume and fees per account only)")
+    print(f"FillColumns.from_fills:           {load_elapsed:.3f}s")
+    print(f"aggregate, all accounts at once:  {aggregate_elapsed:.3f}s "
+          f"({len(result['account'])} accounts, {len(result['symbol'])} symbols, {len(result['day'])} days)")
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = Ledger(os.path.join(directory, "ledger.sqlite3"))
+        for account, fills in fills_by_account.items():
+            ledger.add(account, fills)
+        start = perf_counter()
+        ledger_columns = FillColumns.from_ledger(ledger)
+        ledger_elapsed = perf_counter() - start
+        ledger.close()
+    print(f"FillColumns.from_ledger:          {ledger_elapsed:.3f}s ({len(ledger_columns)} fills)")
+    column_bytes = sum(array.nbytes for array in (columns.account, columns.symbol, columns.fee_symbol,
+                                                  columns.price, columns.quantity, columns.fee,
+                                                  columns.fee_at_price, columns.side, columns.timestamp))
+    print(f"{count} fills in {column_bytes / 2 ** 20:.1f}MB of columns")
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
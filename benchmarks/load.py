@@ -0,0 +1,166 @@
+"""
+    Load benchmark of the Trade buy/sell cycle against the local mock exchange.
+
+    For every account count it starts the mock exchange, runs one AccountWorker per
+    generated account for the given duration and prints orders/sec, p50/p95/p99
+    request latency per endpoint, memory per account and retry counts.
+
+    Usage:
+        python -m benchmarks.load [--accounts 10,100,1000] [--duration 10] [--latency 0.02] ...
+"""
+import argparse
+import asyncio
+import base64
+import resource
+from collections import Counter, defaultdict
+from time import perf_counter
+
+import aiohttp
+from loguru import logger
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat, PrivateFormat, NoEncryption
+
+import utils.helpers
+from backpack import clock
+from backpack.market_data import MarketDataFeed
+from backpack.rate_limit import RateLimiter
+from backpack.sessions import SessionPool
+from backpack.worker import WorkerPool, symbol_trades
+from backpack.open_orders import share_trackers
+from backpack.orders import share_batchers
+from benchmarks.mock_exchange import MockConfig, SYMBOLS, start
+from enums.request_enums import OrderState
+
+
+def _account() -> tuple:
+    key = Ed25519PrivateKey.generate()
+    private_key = base64.b64encode(key.private_bytes(Encoding.Raw, PrivateFormat.Raw, NoEncryption())).decode()
+    public_key = base64.b64encode(key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)).decode()
+    return public_key, private_key
+
+
+def _latency_tracer(latencies: dict) -> aiohttp.TraceConfig:
+    async def on_request_start(session, context, params):
+        context.started = perf_counter()
+
+    async def on_request_end(session, context, params):
+        latencies[params.url.path].append(perf_counter() - context.started)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+def _percentile(values: list, percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))] * 1e3 if ordered else 0.0
+
+
+def _rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+async def run(accounts: int, duration: float, config: MockConfig, time_in_force: str,
+              pipeline: bool = False, feed_ttl: float = 1.0, symbols: int = 1, batch: bool = False,
+              track: bool = False, max_order_age: float = 60, loops: int = 1) -> dict:
+    exchange, runner, url = await start(config)
+    latencies = defaultdict(list)
+    pool = SessionPool(trace_configs=[_latency_tracer(latencies)])
+    limiter = RateLimiter(key_rate=1000, proxy_rate=1e6, endpoint_rate=1e6)
+    feed = MarketDataFeed(ttl=feed_ttl)
+    rss_before = _rss_kb()
+    trades = symbol_trades([(*_account(), None) for _ in range(accounts)],
+                           [{"symbol": symbol, "min_quantity": 0.1, "max_quantity": 1, "time_in_force": time_in_force,
+                             "weight": loops} for symbol in SYMBOLS[:symbols]],
+                           pool=pool, feed=feed, limiter=limiter, api_url=url, pipeline=pipeline)
+    if batch:
+        share_batchers(trades)
+    trackers = share_trackers(trades, interval=1, max_age=max_order_age) if track else {}
+    workers = WorkerPool(trades)
+    started = perf_counter()
+    workers.start()
+    await asyncio.sleep(duration)
+    await workers.stop(timeout=0)
+    for tracker in trackers.values():
+        tracker.stop()
+    elapsed = perf_counter() - started
+    rss_after = _rss_kb()
+    await pool.close()
+    await runner.cleanup()
+
+    outcomes = sum((trade.outcomes for trade in trades), Counter())
+    orders = sum(outcomes.values())
+    order_latencies = latencies["/api/v1/order"]
+    return {"accounts": accounts,
+            "orders_per_sec": orders / elapsed,
+            "p50_ms": _percentile(order_latencies, 50),
+            "p95_ms": _percentile(order_latencies, 95),
+            "p99_ms": _percentile(order_latencies, 99),
+            "trades_p99_ms": _percentile(latencies["/api/v1/trades"], 99),
+            "kb_per_account": max(0, rss_after - rss_before) / accounts,
+            "cycle_seconds": elapsed * accounts / max(1, workers.cycles),
+            "saved_ms_per_cycle": workers.latency_saved / max(1, workers.cycles) * 1e3,
+            "signature_rejections": clock.server_clock.rejections,
+            "requests_per_order": exchange.counters["requests"] / max(1, orders),
+            "volume": sum(trade.volume for trade in trades),
+            "open_orders": {"tracked": sum(len(tracker) for tracker in trackers.values()),
+                            "settled": sum(tracker.settled for tracker in trackers.values()),
+                            "cancelled": sum(tracker.cancelled for tracker in trackers.values()),
+                            "requests": sum(tracker.requests for tracker in trackers.values())},
+            "retries": sum(trade.state_counts[OrderState.BACKOFF.value] for trade in trades),
+            "outcomes": dict(outcomes),
+            "feed": feed.stats(),
+            "exchange": dict(exchange.counters)}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--accounts", default="10,100,1000")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--fill-probability", type=float, default=0.8)
+    parser.add_argument("--expire-probability", type=float, default=0.1)
+    parser.add_argument("--time-in-force", default="IOC")
+    parser.add_argument("--clock-skew", type=float, default=0.0, help="seconds the mock clock is ahead")
+    parser.add_argument("--symbols", type=int, default=1, help=f"symbols traded by every account, up to {len(SYMBOLS)}")
+    parser.add_argument("--loops", type=int, default=1, help="concurrent buy/sell loops per account and symbol")
+    parser.add_argument("--batch", action="store_true", help="send the orders of an account in batches")
+    parser.add_argument("--no-batch-endpoint", action="store_true", help="the mock does not serve /api/v1/orders")
+    parser.add_argument("--track-orders", action="store_true", help="reconcile the resting GTC orders every second")
+    parser.add_argument("--max-order-age", type=float, default=60, help="seconds before a resting order is cancelled")
+    parser.add_argument("--no-clock-sync", action="store_true", help="sign with the local clock")
+    parser.add_argument("--sleep", type=int, default=0, help="seconds between the legs")
+    parser.add_argument("--pipeline", action="store_true", help="prefetch the sell price")
+    parser.add_argument("--feed-ttl", type=float, default=1.0, help="seconds a trade tape snapshot is fresh")
+    args = parser.parse_args()
+    config = MockConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, fill_probability=args.fill_probability,
+                        expire_probability=args.expire_probability, clock_skew=args.clock_skew,
+                        batch_orders=not args.no_batch_endpoint)
+    clock.clock_sync = not args.no_clock_sync
+    # no pause between the legs and no log output, we measure the request path
+    logger.remove()
+    utils.helpers.sleep_minimal = utils.helpers.sleep_maximal = args.sleep
+    utils.helpers.retry_max_delay = 1
+    for accounts in (int(count) for count in args.accounts.split(",")):
+        report = await run(accounts, args.duration, config, args.time_in_force, args.pipeline,
+                           args.feed_ttl, args.symbols, args.batch, args.track_orders, args.max_order_age,
+                           args.loops)
+        print(f"{report['accounts']:>6} accounts: {report['orders_per_sec']:.1f} orders/s, "
+              f"order p50/p95/p99 {report['p50_ms']:.1f}/{report['p95_ms']:.1f}/{report['p99_ms']:.1f}ms, "
+              f"trades p99 {report['trades_p99_ms']:.1f}ms, {report['kb_per_account']:.1f}KB/account, "
+              f"retries {report['retries']}, {report['cycle_seconds']:.3f}s per cycle, "
+              f"prefetch saved {report['saved_ms_per_cycle']:.1f}ms per cycle, "
+              f"{report['signature_rejections']} signatures refused, "
+              f"{report['requests_per_order']:.2f} requests per order")
+        print(f"        outcomes {report['outcomes']}, feed {report['feed']}, exchange {report['exchange']}")
+        if args.track_orders:
+            print(f"        open orders {report['open_orders']}, volume {report['volume']:.2f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
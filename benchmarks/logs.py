@@ -0,0 +1,96 @@
+"""
+    Event-loop time spent logging order outcomes: loguru's default synchronous
+    handler against utils.log (queued sink, repeat filter, batched JSON records).
+
+    Filled orders are logged through Trade._handle_outcome, followed by a burst of
+    "Bad request, retrying..." errors, into a file and into a stream that blocks
+    on every write like a slow terminal.
+
+    Usage:
+        python -m benchmarks.logs [orders] [errors]
+"""
+import asyncio
+import base64
+import os
+import sys
+import tempfile
+from time import perf_counter, sleep
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, PrivateFormat, NoEncryption
+from loguru import logger
+
+from backpack.trader import Trade
+from enums.request_enums import Side
+from utils import log
+
+ORDER = {"id": "1", "orderType": "Limit", "side": "Bid", "symbol": "SOL_USDC", "price": "142.35",
+         "quantity": "1.25", "status": "Filled"}
+PARAMS = {"price": "142.35", "quantity": "1.25"}
+
+
+def _trade() -> Trade:
+    key = base64.b64encode(Ed25519PrivateKey.generate().private_bytes(Encoding.Raw, PrivateFormat.Raw,
+                                                                      NoEncryption())).decode()
+    return Trade("public-key", key, 1, 2, "SOL_USDC", "IOC", None)
+
+
+def _hot_path(trade: Trade, orders: int, errors: int) -> float:
+    started = perf_counter()
+    for _ in range(orders):
+        trade._handle_outcome(Side.BUY, 142.35, PARAMS, ORDER)
+    for _ in range(errors):
+        logger.error("Bad request, retrying...")
+    return perf_counter() - started
+
+
+class _Terminal:
+    """A stream whose every write blocks like a slow terminal or an SSH session."""
+    def __init__(self, path: str, delay: float):
+        self.file = open(path, "a")
+        self.delay = delay
+
+    def write(self, text: str):
+        sleep(self.delay)
+        self.file.write(text)
+
+    def flush(self):
+        self.file.flush()
+
+
+async def _run(orders: int, errors: int, directory: str, delay: float):
+    trade = _trade()
+    lines = orders + errors
+    label = f"{delay * 1e6:.0f}us per write" if delay else "file"
+
+    path = os.path.join(directory, f"default-{delay}.log")
+    stream = _Terminal(path, delay)
+    logger.remove()
+    handler = logger.add(stream, level="DEBUG")
+    seconds = _hot_path(trade, orders, errors)
+    logger.remove(handler)
+    stream.flush()
+    print(f"{label:>16}, default handler: {seconds * 1e6 / lines:.1f}us per line on the loop, "
+          f"{os.path.getsize(path) / 1024:.0f}KB written")
+
+    path = os.path.join(directory, f"queued-{delay}.log")
+    json_path = os.path.join(directory, f"records-{delay}.jsonl")
+    stream = _Terminal(path, delay)
+    repeats = log.configure(queued=True, json_path=json_path, sink=stream)
+    seconds = _hot_path(trade, orders, errors)
+    drained = perf_counter()
+    await log.shutdown()
+    drained = perf_counter() - drained
+    print(f"{label:>16}, utils.log:       {seconds * 1e6 / lines:.1f}us per line on the loop, "
+          f"{drained * 1e3:.0f}ms to drain, {repeats.suppressed} repeated errors suppressed, "
+          f"{os.path.getsize(path) / 1024:.0f}KB + {os.path.getsize(json_path) / 1024:.0f}KB JSON written")
+
+
+def main(orders: int = 20_000, errors: int = 5_000):
+    with tempfile.TemporaryDirectory() as directory:
+        for delay in (0, 0.0002):
+            asyncio.run(_run(orders, errors, directory, delay))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,56 @@
+"""
+    Compares middle_bid_price/middle_ask_price (sort per call) with the rolling PriceEstimator.
+
+    A synthetic tape grows by `batch` trades per refresh and both sides are priced
+    after every refresh, like every Trade does before each order.
+
+    Usage:
+        python -m benchmarks.median [tape_size] [batch] [window]
+"""
+import asyncio
+import random
+import sys
+from time import perf_counter
+
+from utils.helpers import middle_ask_price, middle_bid_price
+from utils.median import PriceEstimator
+
+
+def _tape(size: int) -> list:
+    price = 100.0
+    trades = []
+    for trade_id in range(size):
+        price = max(0.01, price + random.uniform(-0.05, 0.05))
+        trades.append({"id": trade_id, "price": f"{price:.2f}", "quantity": "1.00",
+                       "timestamp": 1_700_000_000_000 + trade_id, "isBuyerMaker": random.random() < 0.5})
+    return trades
+
+
+async def _sort_per_call(tape, batch, window):
+    for end in range(batch, len(tape) + 1, batch):
+        snapshot = tape[max(0, end - 2 * window):end]
+        await middle_bid_price(snapshot)
+        await middle_ask_price(snapshot)
+
+
+async def _rolling(tape, batch, window):
+    estimator = PriceEstimator(window)
+    for end in range(batch, len(tape) + 1, batch):
+        estimator.update(tape[max(0, end - 2 * window):end])
+        estimator.bid_price()
+        estimator.ask_price()
+
+
+async def main(tape_size: int = 200_000, batch: int = 10, window: int = 1000):
+    tape = _tape(tape_size)
+    refreshes = tape_size // batch
+    for name, bench in (("sort per call", _sort_per_call), ("rolling heaps", _rolling)):
+        start = perf_counter()
+        await bench(tape, batch, window)
+        elapsed = perf_counter() - start
+        print(f"{name:>13}: {elapsed:.3f}s total, {elapsed / refreshes * 1e6:.1f}us per refresh "
+              f"({refreshes} refreshes, window {window})")
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:4])))
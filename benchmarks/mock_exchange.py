@@ -0,0 +1,285 @@
+"""
+    Local stand-in for the Backpack API used to load-test Trade without the real exchange.
+
+    Implements /api/v1/markets, /api/v1/trades, /api/v1/order(s) and /wapi/v1/history/fills,
+    keeps the unfilled GTC orders resting until they fill or are cancelled, verifies the
+    ED25519 request signatures and injects latency, errors, throttling and expired orders
+    with configurable probabilities.
+
+    Usage:
+        python -m benchmarks.mock_exchange [--port 8080] [--latency 0.01] [--fill-probability 0.8] ...
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from time import time
+
+from aiohttp import web
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+
+SYMBOLS = ("SOL_USDC", "BTC_USDC", "ETH_USDC")
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.0  # mean seconds added to every response
+    jitter: float = 0.0  # +- seconds of uniform noise on the latency
+    error_rate: float = 0.0  # share of requests answered with a 500 text body
+    throttle_rate: float = 0.0  # share of requests answered with 429
+    fill_probability: float = 0.8  # share of orders filled
+    expire_probability: float = 0.1  # share of unfilled GTC orders that expire, unfilled IOC/FOK always do
+    verify_signatures: bool = True
+    clock_skew: float = 0.0  # seconds the exchange clock is ahead of the local one
+    batch_orders: bool = True  # serve /api/v1/orders
+    rest_fill_probability: float = 0.2  # share of resting orders filled between two open order queries
+
+
+class MockExchange:
+    """
+        In-memory exchange state and aiohttp handlers.
+
+        Attributes:
+            config (MockConfig): The injection settings.
+            counters (dict): Requests, rejected signatures, injected errors and orders per status.
+        """
+    def __init__(self, config: MockConfig | None = None):
+        self.config = config or MockConfig()
+        self.counters = defaultdict(int)
+        self._prices = {symbol: random.uniform(10, 100) for symbol in SYMBOLS}
+        self._tape = {symbol: deque(maxlen=100) for symbol in SYMBOLS}
+        self._trade_id = 0
+        self._fills = defaultdict(lambda: deque(maxlen=1000))
+        self._order_id = 0
+        self._resting = defaultdict(dict)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/v1/time", self.time)
+        app.router.add_get("/api/v1/markets", self.markets)
+        app.router.add_get("/api/v1/trades", self.trades)
+        app.router.add_post("/api/v1/order", self.order)
+        app.router.add_delete("/api/v1/order", self.cancel)
+        if self.config.batch_orders:
+            app.router.add_post("/api/v1/orders", self.orders)
+        app.router.add_get("/api/v1/orders", self.open_orders)
+        app.router.add_delete("/api/v1/orders", self.cancel_all)
+        app.router.add_get("/wapi/v1/history/fills", self.fills)
+        return app
+
+    async def _inject(self) -> web.Response | None:
+        self.counters["requests"] += 1
+        if self.config.latency or self.config.jitter:
+            await asyncio.sleep(max(0.0, self.config.latency + random.uniform(-self.config.jitter,
+                                                                              self.config.jitter)))
+        if random.random() < self.config.throttle_rate:
+            self.counters["throttled"] += 1
+            return web.Response(status=429, text="Too many requests")
+        if random.random() < self.config.error_rate:
+            self.counters["errors"] += 1
+            return web.Response(status=500, text="Internal error")
+        return None
+
+    def _verify(self, request: web.Request, params: dict | list, instruction: str) -> bool:
+        if not self.config.verify_signatures:
+            return True
+        try:
+            timestamp = int(request.headers["X-Timestamp"])
+            window = int(request.headers["X-Window"])
+            # a batch signs every order prefixed with the instruction
+            sign_str = "&".join(f"instruction={instruction}" +
+                                "".join(f"&{key}={value}" for key, value in sorted(order.items()))
+                                for order in (params if isinstance(params, list) else [params]))
+            sign_str += f"&timestamp={timestamp}&window={window}"
+            public_key = Ed25519PublicKey.from_public_bytes(base64.b64decode(request.headers["X-API-Key"]))
+            public_key.verify(base64.b64decode(request.headers["X-Signature"]), sign_str.encode())
+        except (KeyError, ValueError, InvalidSignature):
+            self.counters["bad_signatures"] += 1
+            return False
+        if abs(self._now() - timestamp) > window:
+            self.counters["expired_signatures"] += 1
+            return False
+        return True
+
+    def _now(self) -> float:
+        return time() * 1e3 + self.config.clock_skew * 1e3
+
+    def _trade(self, symbol: str, price: float, quantity: float, is_buyer_maker: bool):
+        self._trade_id += 1
+        self._tape[symbol].append({"id": self._trade_id, "price": f"{price:.2f}", "quantity": f"{quantity:.2f}",
+                                   "quoteQuantity": f"{price * quantity:.2f}",
+                                   "timestamp": int(time() * 1e3), "isBuyerMaker": is_buyer_maker})
+
+    def _walk(self, symbol: str):
+        price = self._prices[symbol] = max(0.01, self._prices[symbol] * random.uniform(0.999, 1.001))
+        self._trade(symbol, price * random.uniform(0.999, 1.001), random.uniform(0.1, 10), random.random() < 0.5)
+
+    async def time(self, request: web.Request) -> web.Response:
+        if (response := await self._inject()) is not None:
+            return response
+        return web.Response(text=str(int(self._now())))
+
+    async def markets(self, request: web.Request) -> web.Response:
+        if (response := await self._inject()) is not None:
+            return response
+        return web.json_response([{"symbol": symbol, "baseSymbol": symbol.split("_")[0], "quoteSymbol": "USDC",
+                                   "filters": {"price": {"tickSize": "0.01"},
+                                               "quantity": {"stepSize": "0.01", "minQuantity": "0.01"}}}
+                                  for symbol in SYMBOLS])
+
+    async def trades(self, request: web.Request) -> web.Response:
+        if (response := await self._inject()) is not None:
+            return response
+        symbol = request.query.get("symbol")
+        if symbol not in self._tape:
+            return web.Response(status=400, text="Invalid symbol")
+        for _ in range(random.randint(1, 5)):
+            self._walk(symbol)
+        while len(self._tape[symbol]) < 20:
+            self._walk(symbol)
+        return web.json_response(list(self._tape[symbol]))
+
+    async def order(self, request: web.Request) -> web.Response:
+        if (response := await self._inject()) is not None:
+            return response
+        params = json.loads(await request.text())
+        if not self._verify(request, params, "orderExecute"):
+            return web.Response(status=401, text="Invalid signature")
+        if params.get("symbol") not in self._tape:
+            return web.Response(status=400, text="Invalid symbol")
+        return web.json_response(self._place(params, request.headers["X-API-Key"]))
+
+    async def orders(self, request: web.Request) -> web.Response:
+        if (response := await self._inject()) is not None:
+            return response
+        orders = json.loads(await request.text())
+        if not self._verify(request, orders, "orderExecute"):
+            return web.Response(status=401, text="Invalid signature")
+        self.counters["batches"] += 1
+        return web.json_response([self._place(params, request.headers["X-API-Key"])
+                                  if params.get("symbol") in self._tape
+                                  else {"code": "INVALID_ORDER", "message": "Invalid symbol"}
+                                  for params in orders])
+
+    def _place(self, params: dict, api_key: str) -> dict:
+        symbol = params["symbol"]
+        self._order_id += 1
+        if random.random() < self.config.fill_probability:
+            status = "Filled"
+            self._fill(api_key, str(self._order_id), params)
+        elif params.get("timeInForce") != "GTC" or random.random() < self.config.expire_probability:
+            status = "Expired"
+        else:
+            status = "New"
+        self.counters[status] += 1
+        order = {"id": str(self._order_id), "orderType": params["orderType"],
+                 "side": params["side"], "symbol": symbol, "price": params["price"],
+                 "quantity": params["quantity"], "executedQuantity": params["quantity"] if status == "Filled" else "0",
+                 "timeInForce": params.get("timeInForce"), "status": status, "createdAt": int(time() * 1e3)}
+        if status == "New":
+            self._resting[api_key][order["id"]] = order
+        return order
+
+    def _fill(self, api_key: str, order_id: str, params: dict):
+        price, quantity = float(params["price"]), float(params["quantity"])
+        self._trade(params["symbol"], price, quantity, params["side"] == "Ask")
+        self._fills[api_key].append(
+            {"tradeId": self._trade_id, "orderId": order_id, "symbol": params["symbol"],
+             "side": params["side"], "price": params["price"], "quantity": params["quantity"],
+             "fee": f"{price * quantity * 0.0008:.6f}", "feeSymbol": "USDC", "isMaker": True,
+             "timestamp": int(time() * 1e3)})
+
+    async def open_orders(self, request: web.Request) -> web.Response:
+        if (response := await self._inject()) is not None:
+            return response
+        params = dict(request.query)
+        if not self._verify(request, params, "orderQueryAll"):
+            return web.Response(status=401, text="Invalid signature")
+        api_key = request.headers["X-API-Key"]
+        resting = self._resting[api_key]
+        # the market reached some of the resting orders since the last query
+        for order_id, order in list(resting.items()):
+            if random.random() < self.config.rest_fill_probability:
+                self._fill(api_key, order_id, order)
+                del resting[order_id]
+                self.counters["rest_filled"] += 1
+        self.counters["open_order_queries"] += 1
+        return web.json_response([order for order in resting.values()
+                                  if "symbol" not in params or order["symbol"] == params["symbol"]])
+
+    async def cancel(self, request: web.Request) -> web.Response:
+        if (response := await self._inject()) is not None:
+            return response
+        params = json.loads(await request.text())
+        if not self._verify(request, params, "orderCancel"):
+            return web.Response(status=401, text="Invalid signature")
+        order = self._resting[request.headers["X-API-Key"]].pop(str(params.get("orderId")), None)
+        if order is None:
+            return web.Response(status=404, text="Order not found")
+        self.counters["Cancelled"] += 1
+        return web.json_response(dict(order, status="Cancelled"))
+
+    async def cancel_all(self, request: web.Request) -> web.Response:
+        if (response := await self._inject()) is not None:
+            return response
+        params = json.loads(await request.text())
+        if not self._verify(request, params, "orderCancelAll"):
+            return web.Response(status=401, text="Invalid signature")
+        resting = self._resting[request.headers["X-API-Key"]]
+        cancelled = [dict(resting.pop(order_id), status="Cancelled")
+                     for order_id, order in list(resting.items()) if order["symbol"] == params.get("symbol")]
+        self.counters["Cancelled"] += len(cancelled)
+        return web.json_response(cancelled)
+
+    async def fills(self, request: web.Request) -> web.Response:
+        if (response := await self._inject()) is not None:
+            return response
+        params = dict(request.query)
+        if not self._verify(request, params, "fillHistoryQueryAll"):
+            return web.Response(status=401, text="Invalid signature")
+        limit = int(params.get("limit", 100))
+        offset = int(params.get("offset", 0))
+        fills = list(reversed(self._fills[request.headers.get("X-API-Key")]))
+        return web.json_response(fills[offset:offset + limit])
+
+
+async def start(config: MockConfig | None = None, host: str = "127.0.0.1", port: int = 0) -> tuple:
+    """
+        Starts the mock exchange on the running loop.
+
+        Returns:
+            tuple: (MockExchange, web.AppRunner, base URL)
+        """
+    exchange = MockExchange(config)
+    runner = web.AppRunner(exchange.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return exchange, runner, f"http://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    for field, default in MockConfig.__dataclass_fields__.items():
+        if field not in ("verify_signatures", "batch_orders"):
+            parser.add_argument(f"--{field.replace('_', '-')}", type=float, default=default.default)
+    parser.add_argument("--no-verify", action="store_true")
+    parser.add_argument("--no-batch-orders", action="store_true")
+    args = parser.parse_args()
+    config = MockConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, fill_probability=args.fill_probability,
+                        expire_probability=args.expire_probability, verify_signatures=not args.no_verify,
+                        clock_skew=args.clock_skew, batch_orders=not args.no_batch_orders,
+                        rest_fill_probability=args.rest_fill_probability)
+    web.run_app(MockExchange(config).app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == '__main__':
+    main()
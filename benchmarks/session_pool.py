@@ -0,0 +1,95 @@
+"""
+    Compares a new ClientSession per request with the pooled keep-alive sessions.
+
+    Starts a local aiohttp server that answers like /api/v1/order, sends the same
+    number of requests both ways and prints new connection (handshake) counts and
+    p50/p99 request latency.
+
+    Usage:
+        python -m benchmarks.session_pool [requests] [concurrency]
+"""
+import asyncio
+import statistics
+import sys
+from time import perf_counter
+
+import aiohttp
+from aiohttp import web
+
+from backpack.sessions import SessionPool
+
+
+async def _order(request):
+    return web.json_response({"status": "Filled", "orderType": "Limit", "side": "Bid",
+                              "quantity": "1", "symbol": "SOL_USDC"})
+
+
+def _tracer(counter: dict) -> aiohttp.TraceConfig:
+    async def on_connection_create_end(session, context, params):
+        counter["handshakes"] += 1
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    return trace_config
+
+
+def _percentile(latencies: list, percent: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))] * 1e3
+
+
+async def _per_call(url, requests_count, concurrency, counter):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = perf_counter()
+            async with aiohttp.ClientSession(trace_configs=[_tracer(counter)]) as session:
+                async with session.post(url, data="{}") as response:
+                    await response.json()
+            latencies.append(perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests_count)))
+    return latencies
+
+
+async def _pooled(url, requests_count, concurrency, counter):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    pool = SessionPool(trace_configs=[_tracer(counter)])
+
+    async def one():
+        async with semaphore:
+            start = perf_counter()
+            async with pool.get(None).post(url, data="{}") as response:
+                await response.json()
+            latencies.append(perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests_count)))
+    await pool.close()
+    return latencies
+
+
+async def main(requests_count: int = 2000, concurrency: int = 50):
+    app = web.Application()
+    app.router.add_post("/api/v1/order", _order)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/api/v1/order"
+    try:
+        for name, bench in (("per-call session", _per_call), ("pooled session", _pooled)):
+            counter = {"handshakes": 0}
+            latencies = await bench(url, requests_count, concurrency, counter)
+            print(f"{name:>17}: handshakes={counter['handshakes']:<6} "
+                  f"p50={_percentile(latencies, 50):.2f}ms p99={_percentile(latencies, 99):.2f}ms "
+                  f"mean={statistics.mean(latencies) * 1e3:.2f}ms")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:3])))
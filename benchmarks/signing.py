@@ -0,0 +1,64 @@
+"""
+    Signed order requests per second on one core: the old Site.headers + json.dumps
+    path against RequestBuilder.build, and RequestBuilder through the signing thread pool.
+
+    Usage:
+        python -m benchmarks.signing [requests]
+"""
+import asyncio
+import base64
+import json
+import sys
+from time import perf_counter, time
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+
+from backpack import signing
+from backpack.signing import RequestBuilder
+
+PARAMS = {"orderType": "Limit", "price": "142.35", "quantity": "1.25", "side": "Bid",
+          "symbol": "SOL_USDC", "timeInForce": "IOC"}
+
+
+def _old(private_key, public_key: str, params: dict, instruction: str, window: int = 5000) -> tuple:
+    sign_str = f"instruction={instruction}" if instruction else ""
+    sorted_params = "&".join(f"{key}={value}" for key, value in sorted(params.items()))
+    if sorted_params:
+        sign_str += "&" + sorted_params
+    timestamp = int(time() * 1e3)
+    sign_str += f"&timestamp={timestamp}&window={window}"
+    encoded_signature = base64.b64encode(private_key.sign(sign_str.encode())).decode()
+    headers = {"X-API-Key": public_key, "X-Signature": encoded_signature, "X-Timestamp": str(timestamp),
+               "X-Window": str(window), "Content-Type": "application/json; charset=utf-8"}
+    return headers, json.dumps(params)
+
+
+async def _offloaded(builder: RequestBuilder, count: int):
+    loop = asyncio.get_running_loop()
+    executor = signing.signing_executor()
+    await asyncio.gather(*(loop.run_in_executor(executor, builder.build, PARAMS, "orderExecute")
+                           for _ in range(count)))
+
+
+def main(count: int = 50_000):
+    private_key = Ed25519PrivateKey.generate()
+    builder = RequestBuilder("public-key", private_key, 5000)
+    print(f"JSON backend: {'orjson' if signing.orjson is not None else 'json'}")
+
+    start = perf_counter()
+    for _ in range(count):
+        _old(private_key, "public-key", PARAMS, "orderExecute")
+    print(f"old headers + json.dumps: {count / (perf_counter() - start):,.0f} signed requests/s")
+
+    start = perf_counter()
+    for _ in range(count):
+        builder.build(PARAMS, "orderExecute")
+    print(f"RequestBuilder.build:     {count / (perf_counter() - start):,.0f} signed requests/s")
+
+    start = perf_counter()
+    asyncio.run(_offloaded(builder, count))
+    print(f"offloaded, {signing.signing_threads} threads:    {count / (perf_counter() - start):,.0f} signed requests/s")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,60 @@
+"""
+    Measures cold start up to the market list, the old way and the cached way.
+
+    Every variant runs in a fresh interpreter against the local mock exchange:
+      - old: import backpack.trader (aiohttp, cryptography) and a blocking requests.get of /api/v1/markets,
+        as the removed Site.get_markets did
+      - cold cache: import main, load_markets() fetches and writes the cache
+      - warm cache: import main, load_markets() reads the cache, no network
+
+    Usage:
+        python -m benchmarks.startup [runs]
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.mock_exchange import start
+
+OLD = """
+from time import perf_counter; started = perf_counter()
+import backpack.trader, requests
+requests.get({url!r} + "/api/v1/markets").json()
+print(perf_counter() - started)
+"""
+CACHED = """
+from time import perf_counter; started = perf_counter()
+import asyncio, main
+asyncio.run(main.load_markets({url!r}, {path!r}))
+print(perf_counter() - started)
+"""
+
+
+def _run(code: str) -> float:
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+async def main(runs: int = 5):
+    exchange, runner, url = await start()
+    loop = asyncio.get_running_loop()
+    results = {"old": [], "cold cache": [], "warm cache": []}
+    try:
+        for _ in range(runs):
+            path = tempfile.mktemp(suffix=".json")
+            results["old"].append(await loop.run_in_executor(None, _run, OLD.format(url=url)))
+            results["cold cache"].append(await loop.run_in_executor(None, _run, CACHED.format(url=url, path=path)))
+            results["warm cache"].append(await loop.run_in_executor(None, _run, CACHED.format(url=url, path=path)))
+            os.remove(path)
+    finally:
+        await runner.cleanup()
+    for name, timings in results.items():
+        print(f"{name:>10}: median {statistics.median(timings) * 1e3:.1f}ms over {runs} runs")
+
+
+if __name__ == '__main__':
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:2])))
@@ -0,0 +1,91 @@
+"""
+    Memory and allocations of the trade tape: JSON snapshots priced with
+    middle_bid_price/middle_ask_price against a shared TradeTape + PriceEstimator.
+
+    For every symbol a stream of /api/v1/trades snapshots is replayed, then both
+    sides are priced once per account, as every Trade does before its orders.
+
+    Usage:
+        python -m benchmarks.tape [symbols] [refreshes] [accounts]
+"""
+import sys
+import tracemalloc
+
+from benchmarks.median import _tape
+from utils.helpers import middle_ask_price, middle_bid_price
+from utils.median import PriceEstimator
+from utils.tape import TradeTape
+
+SNAPSHOT = 100
+
+
+def _measure(run) -> tuple:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    retained = run()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocations = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del retained
+    return size, allocations, peak
+
+
+def _snapshots(tapes: list, refreshes: int):
+    for refresh in range(refreshes):
+        end = SNAPSHOT + refresh * 10
+        for symbol, trades in enumerate(tapes):
+            yield symbol, trades[end - SNAPSHOT:end]
+
+
+def main(symbols: int = 20, refreshes: int = 200, accounts: int = 50):
+    tapes = [_tape(SNAPSHOT + refreshes * 10) for _ in range(symbols)]
+
+    def dicts():
+        latest = {}
+        for symbol, snapshot in _snapshots(tapes, refreshes):
+            # the decoded response is what the old path keeps around and prices from
+            latest[symbol] = [dict(item) for item in snapshot]
+            for _ in range(accounts):
+                _sync(middle_bid_price(latest[symbol]))
+                _sync(middle_ask_price(latest[symbol]))
+        return latest
+
+    def compact(with_estimator: bool):
+        def run():
+            feed = {}
+            for symbol, snapshot in _snapshots(tapes, refreshes):
+                decoded = [dict(item) for item in snapshot]
+                tape, estimator = feed.setdefault(symbol, (TradeTape(SNAPSHOT),
+                                                           PriceEstimator() if with_estimator else None))
+                added = tape.extend(decoded)
+                del decoded
+                if with_estimator:
+                    estimator.update_tape(tape, added)
+                    for _ in range(accounts):
+                        estimator.bid_price()
+                        estimator.ask_price()
+            return feed
+        return run
+
+    for name, run in (("JSON dicts + sort per call", dicts),
+                      ("TradeTape", compact(False)),
+                      ("TradeTape + estimator", compact(True))):
+        size, allocations, peak = _measure(run)
+        print(f"{name:>26}: retained {size / 1024:.0f}KB in {allocations} blocks, "
+              f"peak {peak / 1024:.0f}KB ({symbols} symbols x {SNAPSHOT} trades, {refreshes} refreshes, "
+              f"{accounts} accounts)")
+    print(f"one TradeTape of {SNAPSHOT} trades: {TradeTape(SNAPSHOT).nbytes / 1024:.1f}KB of columns")
+
+
+def _sync(coroutine):
+    # middle_*_price never await, drive them without an event loop
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -31,3 +31,21 @@ class PostOnly(enum.Enum):
 
 class Instruction(enum.Enum):
     ORDER_EXECUTE = "orderExecute"
+    ORDER_QUERY_ALL = "orderQueryAll"
+    ORDER_CANCEL = "orderCancel"
+    ORDER_CANCEL_ALL = "orderCancelAll"
+
+
+class OrderStatus(enum.Enum):
+    NEW = "New"
+    FILLED = "Filled"
+    EXPIRED = "Expired"
+    CANCELLED = "Cancelled"
+    PARTIALLY_FILLED = "PartiallyFilled"
+
+
+class OrderState(enum.Enum):
+    FETCH_PRICE = "fetch_price"
+    SUBMIT = "submit"
+    BACKOFF = "backoff"
+    PAIR_SLEEP = "pair_sleep"
@@ -1,55 +1,92 @@
 import asyncio
-from backpack.trader import Trade, Site
+from backpack.markets import load_markets, market_filters, symbol_plan
+from backpack.metrics import metrics, serve as serve_metrics, dump_periodically as dump_metrics
+from backpack import signing
+from utils import log
 from utils.helpers import *
 import sys
+import argparse
+from loguru import logger
 from enums.request_enums import TimeInForce
 
 
-async def run_all(queue: list):
-    """
-    Asynchronously executes the 'buy_order' method for each trading bot instance in the queue.
+# number of worker processes, set with --processes
+processes = 1
+# prefetch the sell price during the buy and the pair sleep, set with --pipeline
+pipeline = False
+# send the orders of every account through /api/v1/orders in batches, set with --batch-orders
+batch_orders = False
+# reconcile the resting orders of every account and cancel the stale ones, set with --track-orders
+track_orders = False
+# directory the trade tapes are recorded to for utils.replay, set with --record-tapes
+record_tapes = None
+# JSON file of the symbols every account trades, skips the menu, set with --symbols
+symbols_config = None
+# logging and metrics settings of run(), applied again by every worker process
+process_settings = {}
 
-    Args:
-        queue (list): A list of trading bot instances to execute orders.
 
-    Returns:
-        None: The function returns nothing but awaits the completion of all tasks.
+async def infinite_run(public_keys, private_keys, symbols, proxies, processes=1):
     """
-    tasks = []
-    for bot in queue:
-        tasks.append(bot.buy_order())
-    await asyncio.gather(*tasks)
-
-
-async def infinite_run(public_keys, private_keys, min_quantity, max_quantity, symbol, time_in_force, proxies):
-    """
-    Continuously runs the trading bot with the given configuration until the process is interrupted.
+    Continuously runs long-lived workers for every account and symbol until the process is interrupted.
 
     Args:
         public_keys (list): A list of public keys for the trading accounts.
         private_keys (list): A list of private keys for the trading accounts.
-        min_quantity (str): The minimum quantity for the buy order.
-        max_quantity (str): The maximum quantity for the buy order.
-        symbol (str): The trading symbol for the buy order.
-        time_in_force (str): The time in force policy for the buy order.
-        proxies (list): A list of proxy servers to use for each trading bot instance.
+        symbols (list): The symbol_plan entries (symbol, quantity range, time in force, weight) every account trades.
+        proxies (list): A list of proxy servers, the account on the same line sticks to each one while it is healthy.
+        processes (int): The number of worker processes the accounts are split between.
 
     Returns:
         None: The function runs indefinitely and does not return a value.
     """
-    while True:
-        queue = []
-        for y in range(len(public_keys)):
-            trade_instance = (Trade(public_keys[y],
-                                    private_keys[y],
-                                    float(min_quantity),
-                                    float(max_quantity),
-                                    symbol,
-                                    time_in_force,
-                                    proxies[y])
-                              )
-            queue.append(trade_instance)
-        await run_all(queue)
+    # aiohttp and cryptography are imported once trading starts, the menu only needs the cached markets
+    from backpack.market_data import MarketDataFeed
+    from backpack.open_orders import share_trackers
+    from backpack.orders import share_batchers
+    from backpack.proxies import ProxyManager
+    from backpack.supervisor import Supervisor
+    from backpack.worker import WorkerPool, symbol_trades
+
+    # accounts without a proxy line of their own are routed through the healthiest proxy
+    proxies = proxies + [None] * (len(public_keys) - len(proxies))
+    if processes > 1:
+        await Supervisor(public_keys, private_keys, proxies, processes,
+                         settings=dict(process_settings, record_tapes=record_tapes),
+                         symbols=symbols,
+                         pipeline=pipeline,
+                         batch_orders=batch_orders,
+                         track_orders=track_orders).run()
+        return
+    feed = MarketDataFeed(record_dir=record_tapes)
+    proxy_manager = ProxyManager(proxies)
+    await proxy_manager.check_all()
+    proxy_manager.start()
+    # every symbol of an account shares the feed, the proxy and the pooled session of the account
+    trades = symbol_trades(list(zip(public_keys, private_keys, proxies)), symbols,
+                           feed=feed, proxy_manager=proxy_manager, pipeline=pipeline)
+    if batch_orders:
+        share_batchers(trades)
+    trackers = share_trackers(trades) if track_orders else {}
+    pool = WorkerPool(trades)
+    pool.start()
+    try:
+        await pool.wait()
+    finally:
+        await pool.stop(timeout=5)
+        for tracker in trackers.values():
+            tracker.stop()
+        proxy_manager.stop()
+        feed.close()
+        if len(trades) > len(public_keys):
+            volumes = {}
+            for trade in trades:
+                volumes[trade.public_key] = volumes.get(trade.public_key, 0) + trade.volume
+            for public_key, volume in volumes.items():
+                logger.info(f"{public_key} volume over {len(symbols)} symbols: {volume:.2f}")
+        if pipeline:
+            logger.info(f"Prefetching saved {pool.latency_saved:.2f}s over {pool.cycles} cycles "
+                        f"({pool.latency_saved / max(1, pool.cycles) * 1000:.0f}ms per cycle)")
 
 
 async def extra_options():
@@ -57,7 +94,8 @@ async def extra_options():
     Provides additional options for the user to change configuration or check account volume.
 
     The function allows the user to change the sleep interval or check the account volume
-    and spent fees from the last 999 filled orders. After completion, it restarts the main function.
+    and spent fees of all fills, synced incrementally into the local ledger and broken down per symbol
+    when numpy is installed. After completion, it restarts the main function.
 
     Returns:
         None: The function may exit the program or restart the main function based on user input.
@@ -75,17 +113,33 @@ async def extra_options():
             except ValueError:
                 print("Enter only numbers in seconds")
         elif extra_choice == "2":
-            tasks = []
+            from backpack.ledger import Ledger
+            from backpack.trader import Site
+            from utils.analytics import FillColumns, aggregate
+
             proxies = proxy_formation()
             public_keys, private_keys = keys_loader()
-            for iteration, public_key in enumerate(public_keys):
-                tasks.append(Site(public_key,
-                                  private_keys[iteration], proxies[iteration]).get_user_order_history())
-            results = await asyncio.gather(*tasks)
-            for iteration, result in enumerate(results):
-                volume, fee = await account_volume(result)
-                print(f"{public_keys[iteration]} volume for last 999 fills: {volume}\n"
-                      f"{public_keys[iteration]} fees for last 999 fills: {fee}")
+            ledger = Ledger()
+            sites = [Site(public_key, private_keys[iteration],
+                          proxies[iteration % len(proxies)] if proxies else None)
+                     for iteration, public_key in enumerate(public_keys)]
+            results = await asyncio.gather(*(ledger.sync(site) for site in sites), return_exceptions=True)
+            try:
+                # volume, fees and net PnL per account and symbol, in one pass over the ledger
+                by_symbol = aggregate(FillColumns.from_ledger(ledger))["account_symbol"]
+            except ImportError:
+                by_symbol = {}
+            for public_key, result in zip(public_keys, results):
+                if isinstance(result, Exception):
+                    logger.error(f"{public_key} fills were not synced, showing stored totals: {result}")
+                volume, fee, fills = ledger.totals(public_key)
+                print(f"{public_key} volume for {fills} fills: {volume}\n"
+                      f"{public_key} fees for {fills} fills: {fee}")
+                for (account, symbol), row in by_symbol.items():
+                    if account == public_key:
+                        print(f"    {symbol}: volume {row['volume']:.2f}, fees {row['fees']:.4f}, "
+                              f"net PnL {row['net_pnl']:.2f}")
+            ledger.close()
         await main()
 
 
@@ -100,10 +154,13 @@ async def main():
         Returns:
             None: The function is the main event loop of the application and does not return a value.
         """
+    if symbols_config:
+        await headless_run(symbols_config)
+        return
     order_types = ""
     for iteration, order in enumerate(TimeInForce):
         order_types += f"{iteration}.{order.name}\n"
-    market = Site.get_markets()
+    market = await load_markets()
     symbols, symbols_list = get_symbols(market)
     print(f"Choose symbol:\n" + symbols + "\nPrint 000 for extra-options")
     symbol_choice = input()
@@ -122,15 +179,16 @@ async def main():
                     proxies = proxy_formation()
                     public_keys, private_keys = keys_loader()
                     if 0.01 <= float(min_quantity) < float(max_quantity):
-                        if len(public_keys) == len(private_keys) == len(proxies):
-                            await infinite_run(public_keys, private_keys,
-                                               min_quantity, max_quantity,
-                                               symbols_list[int(symbol_choice)],
-                                               TimeInForce(int(order_type)).name,
-                                               proxies,
-                                               )
+                        if len(public_keys) == len(private_keys) and proxies:
+                            symbols = symbol_plan([{"symbol": symbols_list[int(symbol_choice)],
+                                                    "min_quantity": float(min_quantity),
+                                                    "max_quantity": float(max_quantity),
+                                                    "time_in_force": TimeInForce(int(order_type)).name,
+                                                    "weight": 1}],
+                                                  market_filters(market))
+                            await infinite_run(public_keys, private_keys, symbols, proxies, processes)
                         else:
-                            print("Quantity of private_keys, public_keys and proxies must be equal!")
+                            print("Quantity of private_keys and public_keys must be equal and at least one proxy is required!")
                 except ValueError as e:
                     print(e)
             except ValueError:
@@ -141,5 +199,105 @@ async def main():
         print("The choice must be a number of symbol")
 
 
+async def headless_run(path: str):
+    """
+        Trades the symbols of a JSON file with every account, without the menu.
+
+        The market index is built once from the cached /api/v1/markets and shared by
+        every account, each account runs weight concurrent loops per symbol.
+
+        Args:
+            path (str): The symbols file, see utils.helpers.symbols_loader.
+
+        Returns:
+            None
+        """
+    symbols = symbol_plan(symbols_loader(path), market_filters(await load_markets()))
+    if not symbols:
+        print(f"No tradable symbol in {path}")
+        return
+    proxies = proxy_formation()
+    public_keys, private_keys = keys_loader()
+    if len(public_keys) != len(private_keys) or not proxies:
+        print("Quantity of private_keys and public_keys must be equal and at least one proxy is required!")
+        return
+    logger.info(f"Trading {', '.join(entry['symbol'] for entry in symbols)} with {len(public_keys)} accounts")
+    await infinite_run(public_keys, private_keys, symbols, proxies, processes)
+
+
+async def run(metrics_port=None, metrics_json=None, queued_logs=False, log_json=None, offload_signing=False):
+    """
+        Runs the application and closes the pooled HTTP sessions on shutdown.
+
+        Args:
+            metrics_port (int | None): Port to serve Prometheus metrics on, metrics stay disabled when None.
+            metrics_json (str | None): File to dump metrics to every 10 seconds.
+            queued_logs (bool): Write logs from a background thread and rate limit repeated errors.
+            log_json (str | None): File to append the log records to as JSON lines, in batches.
+            offload_signing (bool): Sign the requests in a thread pool instead of on the event loop.
+
+        Returns:
+            None
+        """
+    process_settings.update(metrics_port=metrics_port, metrics_json=metrics_json,
+                            queued_logs=queued_logs, log_json=log_json, offload_signing=offload_signing)
+    signing.offload_signing = offload_signing
+    background = []
+    runner = None
+    if queued_logs or log_json:
+        log.configure(queued=queued_logs, json_path=log_json)
+    if metrics_port or metrics_json:
+        metrics.enable()
+    if metrics_port:
+        runner = await serve_metrics(metrics_port)
+    if metrics_json:
+        background.append(asyncio.create_task(dump_metrics(metrics_json)))
+    try:
+        await main()
+    finally:
+        for task in background:
+            task.cancel()
+        if runner is not None:
+            await runner.cleanup()
+        metrics.disable()
+        sessions = sys.modules.get("backpack.sessions")
+        if sessions is not None:
+            await sessions.session_pool.close()
+        if queued_logs or log_json:
+            await log.shutdown()
+
+
 if __name__ == '__main__':
-    asyncio.run(main())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=1,
+                        help="number of worker processes the accounts are split between")
+    parser.add_argument("--metrics-port", type=int,
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics, "
+                             "worker process N serves PORT+1+N")
+    parser.add_argument("--metrics-json",
+                        help="dump metrics as JSON to this file every 10 seconds, "
+                             "worker process N dumps to FILE.shard-N.EXT")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="prefetch the sell price while the buy is in flight and during the sleep")
+    parser.add_argument("--batch-orders", action="store_true",
+                        help="send the concurrent orders of an account in one /api/v1/orders request")
+    parser.add_argument("--track-orders", action="store_true",
+                        help="reconcile the resting orders of every account and cancel the stale ones")
+    parser.add_argument("--queued-logs", action="store_true",
+                        help="write logs from a background thread and rate limit repeated errors")
+    parser.add_argument("--log-json",
+                        help="append the log records to this file as JSON lines, in batches")
+    parser.add_argument("--offload-signing", action="store_true",
+                        help="sign the requests in a thread pool instead of on the event loop, for many accounts")
+    parser.add_argument("--symbols",
+                        help="trade the symbols of this JSON file with every account, without the menu")
+    parser.add_argument("--record-tapes",
+                        help="append the public trades to DIR/SYMBOL.jsonl for python -m utils.replay")
+    args = parser.parse_args()
+    processes = args.processes
+    record_tapes = args.record_tapes
+    pipeline = args.pipeline
+    batch_orders = args.batch_orders
+    track_orders = args.track_orders
+    symbols_config = args.symbols
+    asyncio.run(run(args.metrics_port, args.metrics_json, args.queued_logs, args.log_json, args.offload_signing))
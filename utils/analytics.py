@@ -0,0 +1,192 @@
+import gc
+from contextlib import contextmanager
+from itertools import chain
+from operator import itemgetter
+
+from backpack.ledger import fee_at_price
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency, only needed for the analytics
+    np = None
+
+MS_PER_DAY = 86_400_000
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("Vectorized analytics need numpy, install it with: pip install numpy")
+
+
+@contextmanager
+def _paused_gc():
+    # the collector would rescan every fill for each batch of new row tuples, the rows hold no cycles
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _timestamps(values):
+    values = np.asarray(values)
+    if values.dtype.kind in "iuf":
+        return values.astype(np.int64)
+    # milliseconds as text or ISO 8601 strings, parsed by NumPy without a Python loop
+    digits = np.char.isdigit(values)
+    timestamps = np.empty(len(values), dtype=np.int64)
+    timestamps[digits] = values[digits].astype(np.int64)
+    timestamps[~digits] = values[~digits].astype("datetime64[ms]").astype(np.int64)
+    return timestamps
+
+
+def _codes(values) -> tuple:
+    # a handful of distinct names, a dict lookup per value is cheaper than sorting the strings
+    index = {name: code for code, name in enumerate(dict.fromkeys(values))}
+    return list(index), np.fromiter(map(index.__getitem__, values), np.int32, len(values))
+
+
+class FillColumns:
+    """
+        Fills of many accounts stored column by column in NumPy arrays.
+
+        Attributes:
+            accounts (list): Account names, indexed by the account column.
+            symbols (list): Market symbols, indexed by the symbol column.
+            fee_symbols (list): Fee symbols, indexed by the fee_symbol column.
+            account, symbol, fee_symbol (np.ndarray): int32 codes.
+            price, quantity, fee (np.ndarray): float64 values.
+            fee_at_price (np.ndarray): bool, True when the fee is converted at the fill price.
+            side (np.ndarray): int8, 1 for Bid and -1 for Ask.
+            timestamp (np.ndarray): int64 milliseconds.
+        """
+    def __init__(self, accounts, symbols, fee_symbols, account, symbol, fee_symbol,
+                 price, quantity, fee, side, timestamp):
+        _require_numpy()
+        self.accounts = list(accounts)
+        self.symbols = list(symbols)
+        self.fee_symbols = list(fee_symbols)
+        self.account = account
+        self.symbol = symbol
+        self.fee_symbol = fee_symbol
+        self.price = price
+        self.quantity = quantity
+        self.fee = fee
+        self.side = side
+        self.timestamp = timestamp
+        # the conversion of the ledger totals, decided once per fee symbol and looked up per fill
+        at_price = np.array([fee_at_price(name) for name in self.fee_symbols] or [False], dtype=bool)
+        self.fee_at_price = at_price[fee_symbol]
+
+    def __len__(self):
+        return len(self.price)
+
+    @classmethod
+    def from_fills(cls, fills_by_account: dict) -> "FillColumns":
+        """
+            Builds the columns from /wapi/v1/history/fills responses.
+
+            Args:
+                fills_by_account (dict): account -> list of fill dictionaries.
+
+            Returns:
+                FillColumns: The fills of every account.
+            """
+        _require_numpy()
+        accounts = list(fills_by_account)
+        account = np.repeat(np.arange(len(accounts), dtype=np.int32),
+                            [len(fills_by_account[account]) for account in accounts])
+        fields = itemgetter("symbol", "side", "price", "quantity", "fee", "feeSymbol", "timestamp")
+        # one pass over the fills, map, itemgetter and zip run without a Python frame per fill
+        with _paused_gc():
+            columns = list(zip(*map(fields, chain.from_iterable(fills_by_account.values())))) or [()] * 7
+        symbol, side, price, quantity, fee, fee_symbol, timestamp = columns
+        return cls._from_columns(accounts, account, symbol, side, price, quantity, fee, fee_symbol, timestamp)
+
+    @classmethod
+    def from_ledger(cls, ledger) -> "FillColumns":
+        """
+            Builds the columns from every fill stored in a Ledger.
+
+            Args:
+                ledger (Ledger): The local fill ledger.
+
+            Returns:
+                FillColumns: The fills of every account in the ledger.
+            """
+        _require_numpy()
+        with _paused_gc():
+            rows = ledger.fill_rows()
+            if not rows:
+                return cls.from_fills({})
+            account, symbol, side, price, quantity, fee, fee_symbol, timestamp = zip(*rows)
+        accounts, account = _codes(account)
+        return cls._from_columns(accounts, account, symbol, side, price, quantity, fee, fee_symbol, timestamp)
+
+    @classmethod
+    def _from_columns(cls, accounts, account, symbol, side, price, quantity, fee, fee_symbol,
+                      timestamp) -> "FillColumns":
+        symbols, symbol = _codes(symbol)
+        fee_symbols, fee_symbol = _codes(fee_symbol)
+        return cls(accounts, symbols, fee_symbols, account, symbol, fee_symbol,
+                   np.array(price, dtype=np.float64),
+                   np.array(quantity, dtype=np.float64),
+                   np.array(fee, dtype=np.float64),
+                   np.where(np.fromiter(map("Bid".__eq__, side), bool, len(side)), 1, -1).astype(np.int8),
+                   _timestamps(timestamp))
+
+    def fees_in_quote(self):
+        """
+            Converts every fee to backpack.ledger.fee_currency like the ledger totals, see fee_at_price.
+
+            Returns:
+                np.ndarray: float64 fees.
+            """
+        return np.where(self.fee_at_price, self.fee * self.price, self.fee)
+
+
+def _group(keys, size: int, volume, fees, cash) -> dict:
+    return {"volume": np.bincount(keys, weights=volume, minlength=size),
+            "fees": np.bincount(keys, weights=fees, minlength=size),
+            "net_pnl": np.bincount(keys, weights=cash, minlength=size) - np.bincount(keys, weights=fees,
+                                                                                     minlength=size)}
+
+
+def aggregate(columns: FillColumns) -> dict:
+    """
+        Computes volume, fees and net PnL per account, per symbol and per day in one pass over the columns.
+
+        Net PnL is the realized cash flow (sells minus buys in the quote currency)
+        minus fees, open inventory is not marked to market. Fees are converted like
+        the Ledger totals, so the rows of an account add up to Ledger.totals.
+
+        Args:
+            columns (FillColumns): The fills of every account.
+
+        Returns:
+            dict: "account", "symbol", "day" and "account_symbol" map a key to
+                {"volume": float, "fees": float, "net_pnl": float}.
+        """
+    _require_numpy()
+    volume = columns.price * columns.quantity
+    fees = columns.fees_in_quote()
+    cash = -columns.side * volume
+    days, day = np.unique(columns.timestamp // MS_PER_DAY, return_inverse=True)
+    account_symbol = columns.account.astype(np.int64) * max(1, len(columns.symbols)) + columns.symbol
+    pairs, pair = np.unique(account_symbol, return_inverse=True)
+
+    def rows(names, grouped):
+        return {name: {"volume": float(grouped["volume"][index]),
+                       "fees": float(grouped["fees"][index]),
+                       "net_pnl": float(grouped["net_pnl"][index])}
+                for index, name in enumerate(names)}
+
+    return {"account": rows(columns.accounts, _group(columns.account, len(columns.accounts), volume, fees, cash)),
+            "symbol": rows(columns.symbols, _group(columns.symbol, len(columns.symbols), volume, fees, cash)),
+            "day": rows([str(np.datetime64(int(value), "D")) for value in days],
+                        _group(day, len(days), volume, fees, cash)),
+            "account_symbol": rows([(columns.accounts[value // max(1, len(columns.symbols))],
+                                     columns.symbols[value % max(1, len(columns.symbols))]) for value in pairs],
+                                   _group(pair, len(pairs), volume, fees, cash))}
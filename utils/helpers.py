@@ -1,8 +1,17 @@
+import json
 import random
+from loguru import logger
+from enums.request_enums import TimeInForce
 
 # minimal sleep time between Bid and Ask orders
 sleep_minimal = 5
 sleep_maximal = 10
+# retry policy of a single buy or sell leg
+max_leg_retries = 5
+retry_base_delay = 1
+retry_max_delay = 30
+# seconds a prefetched sell price stays usable in pipelined mode
+prefetch_max_age = 1.0
 
 
 def get_symbols(market: dict) -> str and list:
@@ -39,14 +48,24 @@ def proxy_formation() -> list:
     """
         Reads proxy information from a file and formats it into a list of proxy URLs.
 
+        Lines are host:port:user:password or host:port, blank and malformed lines are skipped.
+
         Returns:
             list: A list of formatted proxy URLs.
         """
     proxies = []
     with open("data/proxies.txt", "r") as f:
-        for line in f:
-            proxy_list = (line.rstrip().split(":"))
-            proxies.append(f"http://{proxy_list[2]}:{proxy_list[3]}@{proxy_list[0]}:{proxy_list[1]}")
+        for number, line in enumerate(f, 1):
+            proxy_list = line.strip().split(":")
+            if proxy_list == [""]:
+                continue
+            if len(proxy_list) not in (2, 4) or not all(proxy_list) or not proxy_list[1].isdigit():
+                logger.warning(f"data/proxies.txt:{number} is not host:port:user:password, skipped")
+                continue
+            if len(proxy_list) == 2:
+                proxies.append(f"http://{proxy_list[0]}:{proxy_list[1]}")
+            else:
+                proxies.append(f"http://{proxy_list[2]}:{proxy_list[3]}@{proxy_list[0]}:{proxy_list[1]}")
     return proxies
 
 
@@ -68,6 +87,37 @@ def keys_loader():
     return public_keys, private_keys
 
 
+def symbols_loader(path: str = "data/symbols.json") -> list:
+    """
+        Loads the symbols every account trades in headless mode.
+
+        The file is a JSON list of {"symbol", "min_quantity", "max_quantity", "weight", "time_in_force"}
+        objects, weight (default 1) is the number of concurrent buy/sell loops of the symbol per
+        account and time_in_force defaults to IOC. Malformed entries are skipped with a warning.
+
+        Returns:
+            list: The symbol entries.
+        """
+    with open(path, "r") as f:
+        items = json.load(f)
+    entries = []
+    for number, item in enumerate(items):
+        try:
+            entry = {"symbol": str(item["symbol"]),
+                     "min_quantity": float(item["min_quantity"]),
+                     "max_quantity": float(item["max_quantity"]),
+                     "weight": int(item.get("weight", 1)),
+                     "time_in_force": TimeInForce[item.get("time_in_force", "IOC").upper()].name}
+        except (KeyError, TypeError, ValueError, AttributeError):
+            logger.warning(f"{path} entry {number} is not a valid symbol entry, skipped")
+            continue
+        if not 0 < entry["min_quantity"] <= entry["max_quantity"] or entry["weight"] < 1:
+            logger.warning(f"{path} entry {number} needs 0 < min_quantity <= max_quantity and weight >= 1, skipped")
+            continue
+        entries.append(entry)
+    return entries
+
+
 def random_sleep_time():
     """
         Generates a random sleep time within a specified range.
@@ -79,17 +129,21 @@ def random_sleep_time():
     return sleep_time
 
 
-async def middle_bid_price(order_history) -> float:
+def backoff_time(attempt: int) -> float:
     """
-        Calculates the median bid price from order history.
+        Generates a jittered exponential backoff time for a retry.
 
         Args:
-            order_history (list): A list of order history dictionaries.
+            attempt (int): The number of the retry, starting from 1.
 
         Returns:
-            float: The median bid price.
+            float: A random sleep time in seconds between 0 and the capped exponential delay.
         """
-    prices = [float(item['price']) for item in order_history if not item['isBuyerMaker']]
+    delay = min(retry_max_delay, retry_base_delay * 2 ** (attempt - 1))
+    return random.uniform(0, delay)
+
+
+def _median(prices: list) -> float:
     sorted_prices = sorted(prices)
     n = len(sorted_prices)
     if n % 2 == 1:
@@ -99,6 +153,22 @@ async def middle_bid_price(order_history) -> float:
     return median_price
 
 
+async def middle_bid_price(order_history) -> float:
+    """
+        Calculates the median bid price from order history.
+
+        Args:
+            order_history (list): A list of order history dictionaries.
+
+        Returns:
+            float: The median bid price.
+        """
+    prices = [float(item['price']) for item in order_history if not item['isBuyerMaker']]
+    if not prices:
+        raise ValueError("No bid trades to price the order from")
+    return _median(prices)
+
+
 async def middle_ask_price(order_history) -> float:
     """
         Calculates the median ask price from order history.
@@ -110,13 +180,9 @@ async def middle_ask_price(order_history) -> float:
             float: The median ask price.
         """
     prices = [float(item['price']) for item in order_history if item['isBuyerMaker']]
-    sorted_prices = sorted(prices)
-    n = len(sorted_prices)
-    if n % 2 == 1:
-        median_price = round(sorted_prices[n//2], 2)
-    else:
-        median_price = round((sorted_prices[n//2-1]+sorted_prices[n//2]) / 2, 2)
-    return median_price
+    if not prices:
+        raise ValueError("No ask trades to price the order from")
+    return _median(prices)
 
 
 async def account_volume(account_orders):
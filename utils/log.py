@@ -0,0 +1,201 @@
+import json
+import queue
+import sys
+import threading
+import traceback
+from time import monotonic
+from loguru import logger
+
+# lines of one call site at WARNING or above let through per period, the rest are counted and dropped
+burst = 5
+period = 10.0
+# JSON records written at once, and seconds a partial batch may wait
+json_batch_size = 200
+json_flush_interval = 1.0
+LOG_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | " \
+             "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+# ANSI colours of LOG_FORMAT for the queued writer, which formats the lines itself
+ANSI_RESET = "\033[0m"
+ANSI_GREEN = "\033[32m"
+ANSI_CYAN = "\033[36m"
+LEVEL_COLOURS = {"TRACE": "\033[36;1m", "DEBUG": "\033[34;1m", "INFO": "\033[1m", "SUCCESS": "\033[32;1m",
+                 "WARNING": "\033[33;1m", "ERROR": "\033[31;1m", "CRITICAL": "\033[41;1m"}
+
+
+class RepeatFilter:
+    """
+        Rate limits repetitive warnings and errors per call site.
+
+        At most `burst` lines of a call site pass per `period` seconds. The first line
+        let through after a quiet spell tells how many similar lines were dropped.
+
+        Attributes:
+            suppressed (int): Lines dropped so far.
+        """
+    def __init__(self, burst: int = burst, period: float = period, level: int = 30):
+        self.burst = burst
+        self.period = period
+        self.level = level
+        self.suppressed = 0
+        self._sites = {}
+
+    def __call__(self, record) -> bool:
+        if record["level"].no < self.level:
+            return True
+        # every handler shares the filter, the record is only counted by the first one
+        decided = record["extra"].get("_repeat")
+        if decided is not None:
+            return decided
+        record["extra"]["_repeat"] = passed = self._admit(record)
+        return passed
+
+    def _admit(self, record) -> bool:
+        key = (record["name"], record["function"], record["line"])
+        now = monotonic()
+        started, count, dropped = self._sites.get(key, (now, 0, 0))
+        if now - started >= self.period:
+            started, count = now, 0
+        if count >= self.burst:
+            self._sites[key] = (started, count, dropped + 1)
+            self.suppressed += 1
+            return False
+        if dropped:
+            record["message"] += f" ({dropped} similar lines suppressed)"
+        self._sites[key] = (started, count + 1, 0)
+        return True
+
+
+class QueuedSink:
+    """
+        Hands log records to a background thread that writes them in batches.
+
+        The event loop thread only appends the record to a queue. The thread
+        formats the console lines, with the colours of LOG_FORMAT when the stream
+        is a terminal and the traceback of logged exceptions, and the optional
+        JSON records, and writes each batch with a single call.
+
+        Attributes:
+            stream: Where the console lines go.
+            colorize (bool): Colour the console lines, by default when the stream is a terminal.
+            json_path (str | None): File the JSON records are appended to.
+            batch_size (int): Records written at once at most.
+            flush_interval (float): Seconds the thread waits for more records.
+        """
+    def __init__(self, stream=sys.stderr, json_path: str | None = None, batch_size: int = json_batch_size,
+                 flush_interval: float = json_flush_interval, colorize: bool | None = None):
+        self.stream = stream
+        if colorize is None:
+            isatty = getattr(stream, "isatty", None)
+            colorize = bool(isatty and isatty())
+        self.colorize = colorize
+        self.json_path = json_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message):
+        self._queue.put(message.record)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - monotonic())))
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            records = [record for record in batch if record is not None]
+            if records:
+                self._write(records)
+            if stop:
+                return
+
+    def _line(self, record, error: str) -> str:
+        timestamp = f"{record['time']:%Y-%m-%d %H:%M:%S.%f}"[:-3]
+        level = record["level"].name
+        if not self.colorize:
+            return f"{timestamp} | {level: <8} | {record['name']}:{record['function']}:" \
+                   f"{record['line']} - {record['message']}\n{error}"
+        colour = LEVEL_COLOURS.get(level, "")
+        return f"{ANSI_GREEN}{timestamp}{ANSI_RESET} | {colour}{level: <8}{ANSI_RESET} | " \
+               f"{ANSI_CYAN}{record['name']}{ANSI_RESET}:{ANSI_CYAN}{record['function']}{ANSI_RESET}:" \
+               f"{ANSI_CYAN}{record['line']}{ANSI_RESET} - {colour}{record['message']}{ANSI_RESET}\n{error}"
+
+    def _write(self, records: list):
+        # logger.exception() and opt(exception=...) records carry the exception, loguru's own
+        # formatting is skipped by the "{message}" format so the traceback is added here
+        errors = ["".join(traceback.format_exception(*record["exception"])) if record["exception"] else ""
+                  for record in records]
+        self.stream.write("".join(self._line(record, error) for record, error in zip(records, errors)))
+        self.stream.flush()
+        if self.json_path is not None:
+            with open(self.json_path, "a") as f:
+                f.write("".join(json.dumps({"time": record["time"].timestamp(),
+                                            "level": record["level"].name,
+                                            "name": record["name"],
+                                            "function": record["function"],
+                                            "line": record["line"],
+                                            "message": record["message"],
+                                            **({"exception": error} if error else {}),
+                                            **{key: value for key, value in record["extra"].items()
+                                               if not key.startswith("_")}}, default=str) + "\n"
+                                for record, error in zip(records, errors)))
+
+    def close(self):
+        """
+            Writes the queued records and stops the thread.
+            """
+        self._queue.put(None)
+        self._thread.join()
+
+
+_sink = None
+
+
+def configure(queued: bool = True, json_path: str | None = None, level: str = "DEBUG",
+              sink=sys.stderr) -> RepeatFilter:
+    """
+        Replaces the default loguru handler for the order hot path.
+
+        With `queued`, the event loop only queues the records and a background
+        thread writes them in batches. Repetitive warnings and errors are rate
+        limited per call site, and `json_path` adds a JSON lines file written by the same thread.
+
+        Args:
+            queued (bool): Write through a queue and a background thread.
+            json_path (str | None): File for the JSON records, written from the queue.
+            level (str): The lowest level written.
+            sink: Where the console lines go.
+
+        Returns:
+            RepeatFilter: The filter, for its count of suppressed lines.
+        """
+    global _sink
+    repeats = RepeatFilter()
+    logger.remove()
+    if queued or json_path is not None:
+        _sink = QueuedSink(sink, json_path)
+        # "{message}" keeps loguru's own formatting on the loop thread to a minimum
+        logger.add(_sink.write, level=level, format="{message}", filter=repeats)
+    else:
+        logger.add(sink, level=level, format=LOG_FORMAT, filter=repeats)
+    return repeats
+
+
+async def shutdown():
+    """
+        Writes the queued records and restores no handler.
+
+        Returns:
+            None
+        """
+    global _sink
+    await logger.complete()
+    logger.remove()
+    if _sink is not None:
+        _sink.close()
+        _sink = None
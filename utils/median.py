@@ -0,0 +1,187 @@
+from collections import deque
+from heapq import heappush, heappop, heapify
+from utils.tape import trade_key
+
+# number of trades per side kept in the rolling price window
+price_window = 100
+
+
+class RollingMedian:
+    """
+        Median of the last `window` values kept in two heaps with lazy deletion.
+
+        Pushing a value costs O(log n), reading the median is O(1).
+
+        Attributes:
+            window (int): The number of most recent values the median is taken over.
+        """
+    def __init__(self, window: int = price_window):
+        self.window = window
+        self._low = []  # max-heap of (-value, seq)
+        self._high = []  # min-heap of (value, seq)
+        self._low_size = 0
+        self._high_size = 0
+        self._in_low = {}  # live seq -> True when stored in the low heap
+        self._order = deque()
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._order)
+
+    def push(self, value: float):
+        """
+            Adds a value and evicts the oldest one when the window is full.
+
+            Args:
+                value (float): The new value.
+            """
+        seq = self._seq
+        self._seq += 1
+        self._order.append(seq)
+        if self._low_size == 0 or value <= -self._low[0][0]:
+            heappush(self._low, (-value, seq))
+            self._in_low[seq] = True
+            self._low_size += 1
+        else:
+            heappush(self._high, (value, seq))
+            self._in_low[seq] = False
+            self._high_size += 1
+        if len(self._order) > self.window:
+            if self._in_low.pop(self._order.popleft()):
+                self._low_size -= 1
+            else:
+                self._high_size -= 1
+        self._rebalance()
+        if len(self._low) + len(self._high) > 2 * self.window:
+            self._compact()
+
+    def median(self) -> float | None:
+        """
+            Returns the median of the window.
+
+            Returns:
+                float | None: The median, or None while the window is empty.
+            """
+        if not self._order:
+            return None
+        if self._low_size > self._high_size:
+            return -self._low[0][0]
+        return (-self._low[0][0] + self._high[0][0]) / 2
+
+    def _prune(self, heap: list):
+        while heap and heap[0][1] not in self._in_low:
+            heappop(heap)
+
+    def _rebalance(self):
+        self._prune(self._low)
+        self._prune(self._high)
+        while self._low_size > self._high_size + 1:
+            value, seq = heappop(self._low)
+            heappush(self._high, (-value, seq))
+            self._in_low[seq] = False
+            self._low_size -= 1
+            self._high_size += 1
+            self._prune(self._low)
+        while self._high_size > self._low_size:
+            value, seq = heappop(self._high)
+            heappush(self._low, (-value, seq))
+            self._in_low[seq] = True
+            self._high_size -= 1
+            self._low_size += 1
+            self._prune(self._high)
+        self._prune(self._low)
+        self._prune(self._high)
+
+    def _compact(self):
+        # drop lazily deleted entries buried below the heap tops
+        self._low = [item for item in self._low if item[1] in self._in_low]
+        self._high = [item for item in self._high if item[1] in self._in_low]
+        heapify(self._low)
+        heapify(self._high)
+
+
+class PriceEstimator:
+    """
+        Keeps rolling bid-side and ask-side medians of a symbol's trade tape.
+
+        Trades are taken in incrementally: only trades newer than the last one
+        seen are pushed, so repeated snapshots of the same tape cost nothing.
+
+        Attributes:
+            bids (RollingMedian): Prices of trades where the buyer was the taker.
+            asks (RollingMedian): Prices of trades where the buyer was the maker.
+            last_trade (int | None): Id (or timestamp) of the newest trade seen.
+        """
+    def __init__(self, window: int = price_window):
+        self.bids = RollingMedian(window)
+        self.asks = RollingMedian(window)
+        self.last_trade = None
+
+    def update(self, order_history: list):
+        """
+            Pushes the trades of a /api/v1/trades snapshot that were not seen yet.
+
+            The snapshot is expected to be ordered by trade id, either way round,
+            and is walked from its newest end until a trade already seen.
+
+            Args:
+                order_history (list): A list of order history dictionaries.
+            """
+        if not order_history:
+            return
+        newest_first = order_history
+        if trade_key(order_history[0]) <= trade_key(order_history[-1]):
+            newest_first = reversed(order_history)
+        trades = []
+        for item in newest_first:
+            key = trade_key(item)
+            if self.last_trade is not None and key <= self.last_trade:
+                break
+            trades.append((key, item))
+        if not trades:
+            return
+        for _, item in reversed(trades):
+            if item['isBuyerMaker']:
+                self.asks.push(float(item['price']))
+            else:
+                self.bids.push(float(item['price']))
+        self.last_trade = trades[0][0]
+
+    def update_tape(self, tape, count: int):
+        """
+            Pushes the newest trades of a TradeTape.
+
+            Args:
+                tape (TradeTape): The symbol's tape.
+                count (int): The number of trades just appended to it.
+            """
+        for trade_id, price, _, is_buyer_maker, _ in tape.rows(count):
+            if is_buyer_maker:
+                self.asks.push(price)
+            else:
+                self.bids.push(price)
+            self.last_trade = trade_id
+
+    def bid_price(self) -> float:
+        """
+            Returns the median bid price of the window.
+
+            Returns:
+                float: The median bid price rounded to 2 decimal places.
+            """
+        median_price = self.bids.median()
+        if median_price is None:
+            raise ValueError("No bid trades to price the order from")
+        return round(median_price, 2)
+
+    def ask_price(self) -> float:
+        """
+            Returns the median ask price of the window.
+
+            Returns:
+                float: The median ask price rounded to 2 decimal places.
+            """
+        median_price = self.asks.median()
+        if median_price is None:
+            raise ValueError("No ask trades to price the order from")
+        return round(median_price, 2)
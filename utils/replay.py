@@ -0,0 +1,315 @@
+"""
+    Replays recorded trade tapes to tune the quantity range, sleep range and time in force
+    without trading real money.
+
+    Tapes are the /api/v1/trades snapshots MarketDataFeed writes with --record-tapes,
+    one JSON list per line. Every parameter combination runs the Trade buy -> sell cycle
+    `runs` times over the tape, all paths advancing together in NumPy arrays.
+
+    Usage:
+        python -m utils.replay data/tapes/SOL_USDC.jsonl --quantity 0.1:0.5 1:2 --sleep 5:10 1:3 --tif IOC GTC
+"""
+import argparse
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import helpers
+from utils.median import PriceEstimator, price_window
+from utils.tape import trade_key
+
+try:
+    import numpy as np
+except ImportError:  # numpy is an optional dependency, only needed for the replay
+    np = None
+
+# trades in one /api/v1/trades snapshot, the first one warms the price window up before trading starts
+snapshot_size = 100
+# seconds of one request round trip, a leg fetches its price and then submits the order
+latency = 0.2
+# seconds a GTC order that did not cross is assumed to rest in the book
+gtc_horizon = 60
+# fee rates of taker (IOC, FOK and crossing GTC) and maker (resting GTC) fills
+taker_fee = 0.001
+maker_fee = 0.0008
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The replay simulator needs numpy, install it with: pip install numpy")
+
+
+def read_snapshots(path: str) -> list:
+    """
+        Merges the recorded snapshots of a tape file into one chronological list of trades.
+
+        Args:
+            path (str): A .jsonl file with one snapshot per line, or a .json file with one snapshot.
+
+        Returns:
+            list: The unique trades, oldest first.
+        """
+    trades = {}
+    with open(path, "r") as f:
+        lines = [f.read()] if path.endswith(".json") else f
+        for line in lines:
+            if line.strip():
+                for trade in json.loads(line):
+                    trades[trade_key(trade)] = trade
+    return [trades[key] for key in sorted(trades)]
+
+
+def _sparse_table(values, reduce, fill: float):
+    # level k holds reduce() over values[i:i + 2**k], queried in O(1) for any range
+    levels = [values]
+    while 2 ** len(levels) <= len(values):
+        previous, span = levels[-1], 2 ** (len(levels) - 1)
+        level = np.full(len(values), fill)
+        level[:len(values) - span] = reduce(previous[:-span], previous[span:])
+        levels.append(level)
+    return np.stack(levels)
+
+
+def _range_query(table, reduce, start, stop):
+    # reduce() over values[start:stop], callers make sure start < stop
+    level = np.log2(stop - start).astype(np.int64)
+    return reduce(table[level, start], table[level, stop - (1 << level)])
+
+
+class ReplayTape:
+    """
+        A recorded trade tape with everything the simulator looks up per step precomputed.
+
+        Attributes:
+            timestamps (np.ndarray): int64 milliseconds of every trade.
+            prices (np.ndarray): float64 trade prices.
+            is_buyer_maker (np.ndarray): bool, True when the taker sold.
+            bid_median (np.ndarray): PriceEstimator.bid_price() after each trade, NaN without bids.
+            ask_median (np.ndarray): PriceEstimator.ask_price() after each trade, NaN without asks.
+            best_ask (np.ndarray): Price of the last taker buy, the ask a new buy order crosses.
+            best_bid (np.ndarray): Price of the last taker sell, the bid a new sell order crosses.
+        """
+    def __init__(self, trades: list, snapshot: int = snapshot_size, window: int = price_window):
+        _require_numpy()
+        if len(trades) < snapshot:
+            raise ValueError(f"The tape has {len(trades)} trades, at least {snapshot} are needed")
+        self.snapshot = snapshot
+        self.window = window
+        self.timestamps = np.array([int(trade["timestamp"]) for trade in trades], dtype=np.int64)
+        self.prices = np.array([float(trade["price"]) for trade in trades], dtype=np.float64)
+        self.is_buyer_maker = np.array([bool(trade["isBuyerMaker"]) for trade in trades])
+        self.bid_median, self.ask_median = self._medians()
+        self.best_ask = self._last(~self.is_buyer_maker)
+        self.best_bid = self._last(self.is_buyer_maker)
+        # resting bids fill against taker sells at or below them, resting asks against taker buys
+        self._sells = _sparse_table(np.where(self.is_buyer_maker, self.prices, np.inf), np.minimum, np.inf)
+        self._buys = _sparse_table(np.where(self.is_buyer_maker, -np.inf, self.prices), np.maximum, -np.inf)
+
+    @classmethod
+    def load(cls, path: str, snapshot: int = snapshot_size, window: int = price_window) -> "ReplayTape":
+        return cls(read_snapshots(path), snapshot, window)
+
+    def __len__(self):
+        return len(self.prices)
+
+    def _medians(self):
+        # the prices the live bot quotes: MarketDataFeed pushes every new trade into a rolling
+        # PriceEstimator, bid and ask windows of the last `window` trades of their own side
+        estimator = PriceEstimator(self.window)
+        bids, asks = estimator.bids, estimator.asks
+        bid_median, ask_median = [], []
+        for price, is_buyer_maker in zip(self.prices.tolist(), self.is_buyer_maker.tolist()):
+            (asks if is_buyer_maker else bids).push(price)
+            bid_median.append(bids.median())
+            ask_median.append(asks.median())
+        # round() of Python like PriceEstimator, np.round differs from it on halves that are not exact in binary
+        return tuple(np.array([np.nan if median is None else round(median, 2) for median in medians])
+                     for medians in (bid_median, ask_median))
+
+    def _last(self, side):
+        index = np.where(side, np.arange(len(self.prices)), -1)
+        np.maximum.accumulate(index, out=index)
+        return np.where(index >= 0, self.prices[np.maximum(index, 0)], np.nan)
+
+    def index_at(self, milliseconds):
+        return np.searchsorted(self.timestamps, milliseconds, side="right") - 1
+
+    def rests_filled(self, buy, price, start, stop):
+        """
+            Tells which resting orders a trade crossed in (start, stop].
+
+            Args:
+                buy (np.ndarray): bool, True for bids.
+                price (np.ndarray): The limit prices.
+                start, stop (np.ndarray): Trade indices bounding the resting time.
+
+            Returns:
+                np.ndarray: bool, True for filled orders.
+            """
+        filled = np.zeros(len(price), dtype=bool)
+        has = stop > start
+        low = _range_query(self._sells, np.minimum, start[has] + 1, stop[has] + 1)
+        high = _range_query(self._buys, np.maximum, start[has] + 1, stop[has] + 1)
+        filled[has] = np.where(buy[has], low <= price[has], high >= price[has])
+        return filled
+
+
+def simulate(tape: ReplayTape, params: list, runs: int = 10, seed: int = 0) -> list:
+    """
+        Runs the Trade buy -> sell cycle over the tape for every parameter combination.
+
+        A leg fetches its median price one round trip after it starts and its order
+        reaches the book one round trip later. IOC and FOK orders fill completely when
+        they cross the last opposite trade and expire otherwise, expired legs are retried
+        with the jittered backoff of Trade._run_leg. GTC orders that do not cross come
+        back "New" and fill as maker orders if a trade crosses them within gtc_horizon.
+
+        Args:
+            tape (ReplayTape): The recorded trades.
+            params (list): Dictionaries with min_quantity, max_quantity, sleep_minimal,
+                sleep_maximal and time_in_force.
+            runs (int): Independent runs of every combination, averaged.
+            seed (int): Seed of the random quantities, sleeps and backoffs.
+
+        Returns:
+            list: One dictionary per combination with its parameters, volume, fees, orders,
+                fills, expired, errors, cycles, fill_rate, volume_per_fee and volume_per_hour.
+                volume_per_fee of IOC and FOK is always 1 / taker_fee, their fill rate is what varies.
+        """
+    _require_numpy()
+    rng = np.random.default_rng(seed)
+    combo = np.repeat(np.arange(len(params)), runs)
+    column = lambda key: np.array([float(p[key]) for p in params])[combo]
+    min_quantity, max_quantity = column("min_quantity"), column("max_quantity")
+    sleep_minimal, sleep_maximal = column("sleep_minimal"), column("sleep_maximal")
+    gtc = np.array([p["time_in_force"] == "GTC" for p in params])[combo]
+    paths = len(combo)
+    start_ms = float(tape.timestamps[tape.snapshot - 1])
+    end_ms = float(tape.timestamps[-1])
+    round_trip = latency * 1000
+
+    now = np.full(paths, start_ms)
+    selling = np.zeros(paths, dtype=bool)
+    attempt = np.ones(paths, dtype=np.int64)
+    quantity = np.round(rng.uniform(min_quantity, max_quantity), 2)
+    counters = {name: np.zeros(paths) for name in ("volume", "fees", "orders", "fills", "expired", "errors", "cycles")}
+
+    active = np.flatnonzero(now < end_ms)
+    while len(active):
+        sell = selling[active]
+        fetched = tape.index_at(now[active] + round_trip)
+        booked = tape.index_at(now[active] + 2 * round_trip)
+        price = np.where(sell, tape.ask_median[fetched], tape.bid_median[fetched])
+        priced = ~np.isnan(price)
+        crossed = priced & np.where(sell, tape.best_bid[booked] >= price, tape.best_ask[booked] <= price)
+        resting = priced & ~crossed & gtc[active]
+        rest_filled = np.zeros(len(active), dtype=bool)
+        if resting.any():
+            stop = tape.index_at(now[active][resting] + 2 * round_trip + gtc_horizon * 1000)
+            rest_filled[resting] = tape.rests_filled(~sell[resting], price[resting], booked[resting], stop)
+        expired = ~crossed & ~resting
+        notional = np.where(priced, price, 0) * quantity[active]
+
+        counters["volume"][active] += np.where(crossed | rest_filled, notional, 0)
+        counters["fees"][active] += np.where(crossed, notional * taker_fee, np.where(rest_filled, notional * maker_fee, 0))
+        counters["orders"][active] += priced
+        counters["fills"][active] += crossed | rest_filled
+        counters["expired"][active] += expired & priced
+        counters["errors"][active] += ~priced
+
+        # filled legs sleep, "New" legs move on at once, expired legs back off or give up
+        clock = now[active] + 2 * round_trip
+        sleep = rng.integers(sleep_minimal[active].astype(np.int64), sleep_maximal[active].astype(np.int64) + 1)
+        backoff = rng.uniform(0, np.minimum(helpers.retry_max_delay,
+                                            helpers.retry_base_delay * 2.0 ** (attempt[active] - 1)))
+        given_up = expired & (attempt[active] > helpers.max_leg_retries)
+        retry = expired & ~given_up
+        clock += np.where(crossed, sleep * 1000, 0) + np.where(retry, backoff * 1000, 0)
+        leg_done = ~retry
+        cycle_done = leg_done & (sell | given_up)
+        attempt[active] = np.where(retry, attempt[active] + 1, 1)
+        selling[active] = np.where(leg_done, ~cycle_done, sell)
+        counters["cycles"][active] += cycle_done
+        renewed = active[cycle_done]
+        quantity[renewed] = np.round(rng.uniform(min_quantity[renewed], max_quantity[renewed]), 2)
+        now[active] = clock
+        active = active[clock < end_ms]
+
+    hours = (end_ms - start_ms) / 3_600_000
+    results = []
+    for index, p in enumerate(params):
+        row = dict(p)
+        row.update({name: float(np.bincount(combo, values, len(params))[index] / runs)
+                    for name, values in counters.items()})
+        row["fill_rate"] = row["fills"] / row["orders"] if row["orders"] else None
+        row["volume_per_fee"] = row["volume"] / row["fees"] if row["fees"] else None
+        row["volume_per_hour"] = row["volume"] / hours if hours else None
+        results.append(row)
+    return results
+
+
+def _simulate_file(path: str, params: list, runs: int, seed: int) -> list:
+    return simulate(ReplayTape.load(path), params, runs, seed)
+
+
+def sweep(path: str, params: list, runs: int = 10, processes: int | None = None, seed: int = 0) -> list:
+    """
+        Simulates every parameter combination, split between worker processes.
+
+        Args:
+            path (str): The recorded tape file.
+            params (list): The parameter combinations, as for simulate().
+            runs (int): Independent runs of every combination.
+            processes (int | None): Worker processes, one per core when None.
+            seed (int): Seed of the first chunk, every chunk gets its own.
+
+        Returns:
+            list: The results of simulate(), in the order of params.
+        """
+    processes = min(processes or multiprocessing.cpu_count(), len(params))
+    if processes <= 1:
+        return _simulate_file(path, params, runs, seed)
+    chunks = [params[shard::processes] for shard in range(processes)]
+    with ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+        done = list(executor.map(_simulate_file, [path] * processes, chunks, [runs] * processes,
+                                 [seed + shard for shard in range(processes)]))
+    # undo the round-robin split
+    results = [None] * len(params)
+    for shard, rows in enumerate(done):
+        results[shard::processes] = rows
+    return results
+
+
+def _pair(value: str) -> tuple:
+    low, high = value.split(":")
+    return float(low), float(high)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded trade tapes to tune the bot settings")
+    parser.add_argument("tape", help="a tape recorded with --record-tapes")
+    parser.add_argument("--quantity", nargs="+", type=_pair, default=[(0.1, 0.5)], help="MIN:MAX quantity ranges")
+    parser.add_argument("--sleep", nargs="+", type=_pair,
+                        default=[(helpers.sleep_minimal, helpers.sleep_maximal)], help="MIN:MAX sleep ranges")
+    parser.add_argument("--tif", nargs="+", default=["IOC", "GTC"], help="time in force values")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--processes", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    params = [{"min_quantity": quantity[0], "max_quantity": quantity[1],
+               "sleep_minimal": int(sleep[0]), "sleep_maximal": int(sleep[1]), "time_in_force": tif}
+              for quantity in args.quantity for sleep in args.sleep for tif in args.tif]
+    results = sweep(args.tape, params, args.runs, args.processes, args.seed)
+    # every taker fill costs the same fee rate, so volume/fee only separates GTC rows with maker fills,
+    # the volume an expired leg did not trade shows up in volume/hour
+    results.sort(key=lambda row: row["volume_per_hour"] or 0, reverse=True)
+    print(f"{'quantity':>12} {'sleep':>7} {'tif':>4} {'volume/hour':>12} {'volume/fee$':>12} "
+          f"{'fill rate':>9} {'fills':>8} {'expired':>8} {'cycles':>8}")
+    for row in results:
+        print(f"{row['min_quantity']:>5g}:{row['max_quantity']:<6g} {row['sleep_minimal']:>3}:{row['sleep_maximal']:<3} "
+              f"{row['time_in_force']:>4} {row['volume_per_hour'] or 0:>12.2f} {row['volume_per_fee'] or 0:>12.1f} "
+              f"{row['fill_rate'] or 0:>9.1%} {row['fills']:>8.1f} {row['expired']:>8.1f} {row['cycles']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+from array import array
+
+# number of trades a tape keeps per symbol
+tape_capacity = 1000
+
+
+def trade_key(trade: dict) -> int:
+    """
+        Returns the ordering key of a trade: its id, or its timestamp when it has none.
+
+        Args:
+            trade (dict): A trade of /api/v1/trades.
+
+        Returns:
+            int: The key.
+        """
+    trade_id = trade.get("id")
+    return int(trade_id) if trade_id is not None else int(trade["timestamp"])
+
+
+class TradeTape:
+    """
+        Fixed-capacity ring buffer of a symbol's trades stored in typed arrays.
+
+        One tape per symbol is shared read-only by every Trade; the columns hold
+        id, price, quantity, isBuyerMaker and timestamp without a dict per trade.
+
+        Attributes:
+            capacity (int): The number of trades kept, older ones are overwritten.
+            last_id (int | None): Key of the newest trade stored.
+        """
+    def __init__(self, capacity: int = tape_capacity):
+        self.capacity = capacity
+        self._ids = array("q", bytes(8 * capacity))
+        self._prices = array("d", bytes(8 * capacity))
+        self._quantities = array("d", bytes(8 * capacity))
+        self._buyer_maker = array("b", bytes(capacity))
+        self._timestamps = array("q", bytes(8 * capacity))
+        self._head = 0
+        self._size = 0
+        self.last_id = None
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in
+                   (self._ids, self._prices, self._quantities, self._buyer_maker, self._timestamps))
+
+    def extend(self, order_history: list) -> int:
+        """
+            Appends the trades of a /api/v1/trades snapshot that are newer than the last one stored.
+
+            The snapshot is expected to be ordered by trade id, either way round.
+
+            Args:
+                order_history (list): A list of order history dictionaries.
+
+            Returns:
+                int: The number of trades appended.
+            """
+        if not order_history:
+            return 0
+        ascending = trade_key(order_history[0]) <= trade_key(order_history[-1])
+        count = len(order_history)
+        if self.last_id is not None:
+            # count the new trades from the newest end of the snapshot
+            newest_first = reversed(order_history) if ascending else order_history
+            count = 0
+            for item in newest_first:
+                if trade_key(item) <= self.last_id:
+                    break
+                count += 1
+        if not count:
+            return 0
+        new = order_history[-count:] if ascending else reversed(order_history[:count])
+        for item in new:
+            head = self._head
+            key = trade_key(item)
+            self._ids[head] = key
+            self._prices[head] = float(item["price"])
+            self._quantities[head] = float(item["quantity"])
+            self._buyer_maker[head] = item["isBuyerMaker"]
+            self._timestamps[head] = int(item.get("timestamp") or 0)
+            self._head = (head + 1) % self.capacity
+            self.last_id = key
+        self._size = min(self.capacity, self._size + count)
+        return min(count, self.capacity)
+
+    def _indices(self, count: int | None = None):
+        count = self._size if count is None else min(count, self._size)
+        start = self._head - count
+        return (index % self.capacity for index in range(start, self._head))
+
+    def rows(self, count: int | None = None):
+        """
+            Iterates the newest `count` trades in chronological order.
+
+            Args:
+                count (int | None): The number of trades, all stored trades when None.
+
+            Yields:
+                tuple: (id, price, quantity, is_buyer_maker, timestamp)
+            """
+        for index in self._indices(count):
+            yield (self._ids[index], self._prices[index], self._quantities[index],
+                   bool(self._buyer_maker[index]), self._timestamps[index])
+
+    def prices(self, is_buyer_maker: bool | None = None) -> list:
+        """
+            Returns the stored prices in chronological order, optionally of one side only.
+
+            Args:
+                is_buyer_maker (bool | None): True for the ask side, False for the bid side, None for both.
+
+            Returns:
+                list: The prices.
+            """
+        if is_buyer_maker is None:
+            return [self._prices[index] for index in self._indices()]
+        return [self._prices[index] for index in self._indices() if self._buyer_maker[index] == is_buyer_maker]
+
+    def column(self, name: str) -> memoryview:
+        """
+            Returns a read-only view of a raw column in ring order (not chronological).
+
+            Args:
+                name (str): ids, prices, quantities, buyer_maker or timestamps.
+
+            Returns:
+                memoryview: The read-only column.
+            """
+        return memoryview(getattr(self, "_" + name)).toreadonly()
+
+    def to_list(self, count: int | None = None) -> list:
+        """
+            Returns the newest `count` trades as /api/v1/trades dictionaries, oldest first.
+
+            Args:
+                count (int | None): The number of trades, all stored trades when None.
+
+            Returns:
+                list: The trades.
+            """
+        return [{"id": trade_id, "price": str(price), "quantity": str(quantity),
+                 "isBuyerMaker": is_buyer_maker, "timestamp": timestamp}
+                for trade_id, price, quantity, is_buyer_maker, timestamp in self.rows(count)]